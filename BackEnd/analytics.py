@@ -0,0 +1,172 @@
+import sqlite3
+
+try:
+    import numpy as np
+except ImportError:  # NumPy为可选依赖，缺失时统计面板只显示汇总表数据
+    np = None
+
+# 增量读取id大于上次读取位置的计时记录: id、开始/结束时间戳(本地时间秒)、设定时长、任务id、模式、是否完成、是否仍在进行
+SESSION_COLUMNS_QUERY = '''
+    SELECT
+        id,
+        CAST(strftime('%s', start_time, 'localtime') AS INTEGER),
+        CAST(strftime('%s', terminate_time, 'localtime') AS INTEGER),
+        duration,
+        IFNULL(task_id, -1),
+        mode,
+        status = 'finished',
+        status = 'running'
+    FROM BasicUserData WHERE id > ? ORDER BY id
+'''
+SESSION_COLUMNS = ('id', 'start', 'terminate', 'duration', 'task_id', 'mode', 'finished', 'running')
+SESSION_DTYPE = np.dtype([(column, np.int64) for column in SESSION_COLUMNS]) if np is not None else None
+
+# 数据版本: 其他连接提交写入后改变，本连接只读
+DATA_VERSION_QUERY = 'PRAGMA data_version'
+
+TASK_NAMES_QUERY = 'SELECT id, task FROM ToDoList'
+
+DURATION_BINS = (0, 300, 900, 1500, 1800, 2700, 3600, 7200, 86400)
+
+
+def available() -> bool:
+    return np is not None
+
+
+class SessionArrays:
+    # 以列数组保存的计时记录
+
+    def __init__(self, data):
+        # data为SESSION_COLUMNS字段的结构化数组
+        self.id = data['id']
+        self.start = data['start']
+        self.terminate = data['terminate']
+        self.duration = data['duration']
+        self.task_id = data['task_id']
+        self.mode = data['mode']
+        self.finished = data['finished'].astype(bool)
+        # 完成的计时取设定时长，中断的计时取实际经过的时长
+        elapsed = np.clip(self.terminate - self.start, 0, self.duration)
+        self.seconds = np.where(self.finished, self.duration, elapsed)
+        self.focus = self.mode == 1
+
+    def __len__(self):
+        return len(self.start)
+
+
+class SessionAnalytics:
+    # 面向长历史的向量化统计，在数据库后台线程中执行(见BackEnd.db_worker)，界面线程只接收snapshot的结果
+    # 结果按数据库的数据版本缓存，版本未变时不再读取；版本变化时已结束的计时不会改变，只读取上次之后新增的记录
+
+    def __init__(self):
+        self._conn = None
+        self._data = np.zeros(0, dtype=SESSION_DTYPE)
+        self._arrays = SessionArrays(self._data)
+        self._last_id = 0
+        self._version = None
+        self._snapshot = None
+        self._cache = {}
+
+    def _connect(self, db):
+        # sqlite3连接在后台线程中创建并只在该线程使用，按行批量取值比逐个读取QSqlQuery的单元格快得多
+        if self._conn is None:
+            self._conn = sqlite3.connect(db.db_path)
+            self._conn.execute('PRAGMA query_only = ON')
+        return self._conn
+
+    def update(self, db) -> int:
+        # 读取新结束的计时，返回新增的条数；遇到仍在进行的计时即停止，下次从它开始读取
+        rows = np.fromiter(self._connect(db).execute(SESSION_COLUMNS_QUERY, (self._last_id,)), dtype=SESSION_DTYPE)
+        running = np.flatnonzero(rows['running'])
+        if len(running):
+            rows = rows[:running[0]]
+        if len(rows) == 0:
+            return 0
+        self._data = np.concatenate((self._data, rows))
+        self._arrays = SessionArrays(self._data)
+        self._last_id = int(rows['id'][-1])
+        self._cache = {}
+        return len(rows)
+
+    def snapshot(self, db) -> dict:
+        # 作为后台线程的请求执行，返回统计面板需要的结果
+        conn = self._connect(db)
+        version = conn.execute(DATA_VERSION_QUERY).fetchone()[0]
+        if self._snapshot is not None and version == self._version:
+            return self._snapshot
+        self.update(db)
+        self._version = version
+        task_names = dict(conn.execute(TASK_NAMES_QUERY).fetchall())
+        ids, seconds = self.per_task_seconds()
+        order = np.argsort(seconds)[::-1]
+        counts, edges = self.duration_histogram()
+        self._snapshot = {
+            'sessions': len(self._arrays),
+            'heatmap': self.time_of_day_heatmap(),
+            'rolling_average': self.rolling_average(7),
+            'histogram': list(zip(edges[:-1].tolist(), edges[1:].tolist(), counts.tolist())),
+            'per_task': [(task_names.get(int(ids[i]), '#%d' % ids[i]), int(seconds[i])) for i in order],
+        }
+        return self._snapshot
+
+    def close(self, db=None):
+        # 在后台线程中关闭sqlite3连接
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute(self._arrays)
+        return self._cache[key]
+
+    def duration_histogram(self, bins=DURATION_BINS):
+        # 专注计时的时长分布，返回(各区间次数, 区间边界)
+        def compute(s):
+            counts, edges = np.histogram(s.seconds[s.focus], bins=np.asarray(bins))
+            return counts, edges
+        return self._cached(('histogram', tuple(bins)), compute)
+
+    def time_of_day_heatmap(self):
+        # 7x24矩阵，行为星期(周一为0)，列为开始时刻的小时，值为专注秒数
+        def compute(s):
+            start = s.start[s.focus]
+            hour = (start // 3600) % 24
+            weekday = (start // 86400 + 3) % 7  # 1970-01-01为周四
+            heatmap = np.zeros((7, 24), dtype=np.int64)
+            np.add.at(heatmap, (weekday, hour), s.seconds[s.focus])
+            return heatmap
+        return self._cached(('heatmap',), compute)
+
+    def daily_focus(self):
+        # 从第一次计时到最后一次计时每天的专注秒数，返回(第一天的天序号, 每日秒数数组)
+        def compute(s):
+            if not s.focus.any():
+                return 0, np.zeros(0, dtype=np.int64)
+            day = s.start[s.focus] // 86400
+            first = day.min()
+            return int(first), np.bincount(day - first, weights=s.seconds[s.focus]).astype(np.int64)
+        return self._cached(('daily',), compute)
+
+    def rolling_average(self, window=7):
+        # 每日专注秒数的滑动平均，长度与daily_focus相同，前window-1天按已有天数平均
+        def compute(s):
+            _, daily = self.daily_focus()
+            if len(daily) == 0:
+                return np.zeros(0)
+            sums = np.convolve(daily, np.ones(window), mode='full')[:len(daily)]
+            counts = np.minimum(np.arange(1, len(daily) + 1), window)
+            return sums / counts
+        return self._cached(('rolling', window), compute)
+
+    def per_task_seconds(self):
+        # 按任务id汇总的专注秒数，返回(任务id数组, 秒数数组)；未选择任务的计时(id为空)不计入
+        # 任务完成或移出清单后仍保留id(见BackEnd.schema版本6)，已完成任务同样统计
+        def compute(s):
+            mask = s.focus & (s.task_id >= 0)
+            if not mask.any():
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+            totals = np.bincount(s.task_id[mask], weights=s.seconds[mask]).astype(np.int64)
+            ids = np.nonzero(totals)[0]
+            return ids, totals[ids]
+        return self._cached(('per_task',), compute)
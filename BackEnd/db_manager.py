@@ -0,0 +1,200 @@
+import os
+import sys
+
+from PyQt5.QtSql import QSqlDatabase, QSqlQuery
+from PyQt5.QtWidgets import QMessageBox
+
+from BackEnd import schema
+from Log.my_logger import get_logger
+
+CONNECTION_NAME = 'time_arranger'
+WORKER_CONNECTION_NAME = 'time_arranger_worker'
+DB_FILE_NAME = 'time_arranger.sqlite'
+
+# 长连接打开后执行一次的调优参数
+PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -8000',
+    'PRAGMA foreign_keys = ON',
+)
+
+
+class MigrationError(Exception):
+    pass
+
+
+class DBConnectionError(Exception):
+    pass
+
+
+class _QtAdapter:
+    # 迁移框架使用的Qt连接适配器
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def _exec(self, sql) -> QSqlQuery:
+        query = QSqlQuery(self.conn)
+        if query.exec(sql) is False:
+            raise MigrationError('%s: %s' % (sql.strip(), query.lastError().text()))
+        return query
+
+    def user_version(self) -> int:
+        query = self._exec('PRAGMA user_version')
+        query.next()
+        return int(query.value(0))
+
+    def set_user_version(self, version):
+        self._exec('PRAGMA user_version = %d' % version)
+
+    def columns(self, table):
+        record = self.conn.record(table)
+        return [record.fieldName(i) for i in range(record.count())]
+
+    def execute(self, sql):
+        self._exec(sql)
+
+    def transaction(self):
+        return _QtTransaction(self.conn)
+
+
+class _QtTransaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.transaction()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.conn.rollback()
+        else:
+            self.conn.commit()
+        return False
+
+
+class DBManager:
+    # 全局共享的数据库长连接，整个进程只打开一次，退出时关闭
+    # 后台线程使用另一个具名连接(primary=False)，不执行迁移，打开失败时抛出异常而不弹窗
+
+    _instance = None
+
+    def __init__(self, folder, connection_name=CONNECTION_NAME, primary=True):
+        self.folder = folder
+        self.db_path = folder + '//' + DB_FILE_NAME
+        self.connection_name = connection_name
+        self.primary = primary
+        self.conn = None
+        self.open_count = 0  # 实际打开数据库文件的次数
+        self.query_count = 0  # 通过本连接创建的查询数
+        self._logger_init()
+
+    @classmethod
+    def instance(cls, folder=None):
+        # 获取共享的连接管理器，第一次调用时必须给出数据目录
+        if cls._instance is None:
+            if folder is None:
+                folder = os.environ['AppData'] + '\\TimeArranger'
+            if not os.path.exists(folder):
+                os.makedirs(folder)
+            cls._instance = DBManager(folder)
+        return cls._instance
+
+    def _logger_init(self):
+        self.logger = get_logger(
+            name=__name__
+        )
+        self.logger.debug('Logger初始化')
+
+    def open(self):
+        # 已打开则直接复用
+        if self.conn is not None and self.conn.isOpen():
+            return self.conn
+        if QSqlDatabase.contains(self.connection_name):
+            self.conn = QSqlDatabase.database(self.connection_name, False)
+        else:
+            self.conn = QSqlDatabase.addDatabase('QSQLITE', self.connection_name)
+            self.conn.setDatabaseName(self.db_path)
+        if not self.conn.open():
+            if not self.primary:
+                raise DBConnectionError(self.conn.lastError().databaseText())
+            QMessageBox.critical(
+                None,
+                "TimeArranger - 错误!",
+                "数据库连接错误: %s" % self.conn.lastError().databaseText(),
+            )
+            sys.exit(1)
+        self.open_count += 1
+        self._apply_pragmas()
+        if self.primary:
+            self._migrate()
+        self.logger.debug('开启数据库长连接%s', self.connection_name)
+        return self.conn
+
+    def _migrate(self):
+        # 按PRAGMA user_version执行尚未应用的结构迁移
+        try:
+            applied = schema.migrate(_QtAdapter(self.conn), self.logger)
+        except MigrationError as e:
+            QMessageBox.critical(
+                None,
+                "TimeArranger - 错误!",
+                "数据库升级失败: %s" % e,
+            )
+            sys.exit(1)
+        if applied:
+            self.logger.info('数据库结构已升级到版本%d', applied[-1])
+
+    def _apply_pragmas(self):
+        for pragma in PRAGMAS:
+            query = QSqlQuery(self.conn)
+            if query.exec(pragma) is False:
+                self.logger.debug('%s执行失败: %s', pragma, query.lastError().text())
+
+    def connection(self):
+        return self.open()
+
+    def query(self) -> QSqlQuery:
+        # 所有查询都必须绑定到具名连接上
+        self.query_count += 1
+        return QSqlQuery(self.open())
+
+    def _exec_bound(self, sql, params) -> QSqlQuery:
+        query = self.query()
+        query.prepare(sql)
+        for key, value in (params or {}).items():
+            query.bindValue(':' + key, value)
+        if query.exec() is False:
+            self.logger.debug('SQL执行失败: %s', query.lastError().text())
+        return query
+
+    def fetch_all(self, sql, params=None) -> list:
+        # params为不带冒号的命名参数，与sqlite3的写法一致
+        query = self._exec_bound(sql, params)
+        rows = []
+        columns = query.record().count()
+        while query.next():
+            rows.append(tuple(query.value(i) for i in range(columns)))
+        return rows
+
+    def execute(self, sql, params=None) -> bool:
+        return self._exec_bound(sql, params).isActive()
+
+    def table_exists(self, name) -> bool:
+        return name in self.open().tables()
+
+    def stats(self) -> dict:
+        return {
+            'open_count': self.open_count,
+            'query_count': self.query_count,
+        }
+
+    def close(self):
+        if self.conn is None:
+            return
+        self.logger.debug('关闭数据库长连接%s, 统计:%s', self.connection_name, self.stats())
+        self.conn.close()
+        self.conn = None
+        QSqlDatabase.removeDatabase(self.connection_name)
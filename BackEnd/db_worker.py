@@ -0,0 +1,112 @@
+import time
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+
+from BackEnd.db_manager import DBManager, WORKER_CONNECTION_NAME
+from Log.my_logger import get_logger
+
+
+class _DBWorkerObject(QObject):
+    # 运行在后台线程中，持有自己的具名连接，按提交顺序逐个执行请求
+    finished_signal = pyqtSignal(int, object, float)  # 请求号, 结果, 执行耗时(秒)
+
+    def __init__(self, folder):
+        super().__init__()
+        self.folder = folder
+        self.db = None
+        self.logger = get_logger(
+            name=__name__
+        )
+
+    @pyqtSlot(int, object)
+    def run(self, request_id, job):
+        start = time.perf_counter()
+        try:
+            if self.db is None:  # 连接必须在使用它的线程中创建
+                self.db = DBManager(self.folder, WORKER_CONNECTION_NAME, primary=False)
+            result = job(self.db)
+        except Exception as e:
+            self.logger.exception('后台数据库请求%d失败', request_id)
+            result = e
+        self.finished_signal.emit(request_id, result, time.perf_counter() - start)
+
+    def shutdown(self, db):
+        # 作为最后一个请求执行，此前提交的请求都已完成
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+        QThread.currentThread().quit()
+
+
+class DBWorker(QObject):
+    # 数据库后台线程，界面线程只负责把请求放进队列，不再等待磁盘I/O
+    # job(db) 在后台线程中以后台连接调用，返回值通过信号回到界面线程交给callback，出错时callback收到异常对象
+    _request_signal = pyqtSignal(int, object)
+
+    def __init__(self, folder, parent=None):
+        super().__init__(parent)
+        self._callbacks = {}
+        self._next_request = 1
+        self.submitted = 0
+        self.completed = 0
+        self.ui_stall = 0.0  # 界面线程提交请求花费的总时间
+        self.ui_stall_max = 0.0
+        self.db_time = 0.0  # 请求在后台线程的执行总时间，即改为后台执行之前界面线程会被阻塞的时间
+        self.db_time_max = 0.0
+        self._thread = QThread()
+        self._thread.setObjectName('DBWorker')
+        self._worker = _DBWorkerObject(folder)
+        self._worker.moveToThread(self._thread)
+        self._request_signal.connect(self._worker.run)
+        self._worker.finished_signal.connect(self._on_finished)
+        self._logger_init()
+        self._thread.start()
+
+    def _logger_init(self):
+        self.logger = get_logger(
+            name=__name__
+        )
+        self.logger.debug('Logger初始化')
+
+    def submit(self, job, callback=None) -> int:
+        start = time.perf_counter()
+        request_id = self._next_request
+        self._next_request += 1
+        if callback is not None:
+            self._callbacks[request_id] = callback
+        self._request_signal.emit(request_id, job)
+        self.submitted += 1
+        elapsed = time.perf_counter() - start
+        self.ui_stall += elapsed
+        self.ui_stall_max = max(self.ui_stall_max, elapsed)
+        return request_id
+
+    def _on_finished(self, request_id, result, elapsed):
+        self.completed += 1
+        self.db_time += elapsed
+        self.db_time_max = max(self.db_time_max, elapsed)
+        callback = self._callbacks.pop(request_id, None)
+        if callback is not None:
+            callback(result)
+
+    def pending(self) -> int:
+        return self.submitted - self.completed
+
+    def stats(self) -> dict:
+        return {
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'ui_stall_ms': round(self.ui_stall * 1000, 3),
+            'ui_stall_max_ms': round(self.ui_stall_max * 1000, 3),
+            'db_ms': round(self.db_time * 1000, 3),
+            'db_max_ms': round(self.db_time_max * 1000, 3),
+        }
+
+    def stop(self, timeout_ms=5000):
+        # 退出前调用: 等待队列中的请求全部写入后关闭后台连接并结束线程
+        if not self._thread.isRunning():
+            return
+        self._request_signal.emit(0, self._worker.shutdown)
+        if not self._thread.wait(timeout_ms):
+            self.logger.warning('后台数据库线程未在%dms内结束', timeout_ms)
+        self.logger.debug('后台数据库线程已结束, 统计:%s', self.stats())
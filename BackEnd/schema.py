@@ -0,0 +1,253 @@
+import sqlite3
+
+# 数据库结构版本记录在 PRAGMA user_version 中，启动时按顺序执行未应用的迁移
+# 迁移步骤为SQL字符串或AddColumn，与具体的数据库驱动无关，Qt连接和sqlite3连接共用
+
+
+# 一次计时计入统计的秒数: 完成的计时取设定时长，中断的计时取实际经过的时长
+SESSION_SECONDS = '''
+    CASE WHEN status = 'finished' THEN duration
+    ELSE MAX(0, MIN(duration, CAST(strftime('%s', terminate_time) AS INTEGER) - CAST(strftime('%s', start_time) AS INTEGER)))
+    END
+'''
+
+# 把 BasicUserData 中满足 {where} 的已结束计时累加到汇总表，计时结束时按id增量更新，迁移时全表回填
+DAILY_ROLLUP_UPSERT = '''
+    INSERT INTO DailyRollup (day, focus_seconds, relax_seconds, sessions_finished, sessions_interrupted)
+    SELECT
+        date(start_time, 'localtime') AS day,
+        SUM(CASE WHEN mode = 1 THEN secs ELSE 0 END),
+        SUM(CASE WHEN mode = 0 THEN secs ELSE 0 END),
+        SUM(status = 'finished'),
+        SUM(status = 'interrupted')
+    FROM (SELECT start_time, mode, status, %s AS secs FROM BasicUserData WHERE {where})
+    WHERE status != 'running'
+    GROUP BY day
+    ON CONFLICT (day) DO UPDATE SET
+        focus_seconds = focus_seconds + excluded.focus_seconds,
+        relax_seconds = relax_seconds + excluded.relax_seconds,
+        sessions_finished = sessions_finished + excluded.sessions_finished,
+        sessions_interrupted = sessions_interrupted + excluded.sessions_interrupted
+''' % SESSION_SECONDS
+
+TASK_ROLLUP_UPSERT = '''
+    INSERT INTO TaskRollup (task, focus_seconds, sessions_finished, sessions_interrupted, last_day)
+    SELECT
+        task,
+        SUM(secs),
+        SUM(status = 'finished'),
+        SUM(status = 'interrupted'),
+        MAX(date(start_time, 'localtime'))
+    FROM (SELECT task, start_time, status, %s AS secs FROM BasicUserData WHERE mode = 1 AND ({where}))
+    WHERE status != 'running'
+    GROUP BY task
+    ON CONFLICT (task) DO UPDATE SET
+        focus_seconds = focus_seconds + excluded.focus_seconds,
+        sessions_finished = sessions_finished + excluded.sessions_finished,
+        sessions_interrupted = sessions_interrupted + excluded.sessions_interrupted,
+        last_day = MAX(last_day, excluded.last_day)
+''' % SESSION_SECONDS
+
+
+class AddColumn:
+    # 列不存在时才添加，兼容在迁移框架之前就已手动升级过的数据库
+    def __init__(self, table, column, ddl):
+        self.table = table
+        self.column = column
+        self.ddl = ddl
+
+
+MIGRATIONS = (
+    # 1: 迁移框架之前的原始结构
+    (1, (
+        '''
+        CREATE TABLE IF NOT EXISTS ToDoList
+        (
+            "id"  INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL UNIQUE,
+            "is_finished" INT(1) NOT NULL DEFAULT 0,
+            "task" VARCHAR(255)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS BasicUserData
+        (
+            start_time DATETIME NOT NULL DEFAULT current_timestamp PRIMARY KEY,
+            terminate_time DATETIME NOT NULL DEFAULT current_timestamp,
+            task VARCHAR(255),
+            duration INTEGER NOT NULL
+        )
+        ''',
+    )),
+    # 2: 任务显示顺序与id解耦
+    (2, (
+        AddColumn('ToDoList', 'sort_key', 'INTEGER'),
+        'UPDATE ToDoList SET sort_key = id WHERE sort_key IS NULL',
+        'CREATE INDEX IF NOT EXISTS idx_todolist_sort_key ON ToDoList (sort_key)',
+    )),
+    # 3: 计时记录使用整数id，通过task_id关联ToDoList，保留任务名称以便任务删除后仍可统计
+    (3, (
+        '''
+        CREATE TABLE BasicUserData_v3
+        (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER REFERENCES ToDoList (id) ON DELETE SET NULL,
+            task VARCHAR(255),
+            start_time DATETIME NOT NULL DEFAULT current_timestamp,
+            terminate_time DATETIME NOT NULL DEFAULT current_timestamp,
+            duration INTEGER NOT NULL
+        )
+        ''',
+        '''
+        INSERT INTO BasicUserData_v3 (task_id, task, start_time, terminate_time, duration)
+        SELECT
+            (SELECT t.id FROM ToDoList t WHERE t.task = b.task ORDER BY t.id LIMIT 1),
+            b.task, b.start_time, b.terminate_time, b.duration
+        FROM BasicUserData b
+        ORDER BY b.start_time
+        ''',
+        'DROP TABLE BasicUserData',
+        'ALTER TABLE BasicUserData_v3 RENAME TO BasicUserData',
+        'CREATE INDEX idx_basicuserdata_task_id_start ON BasicUserData (task_id, start_time)',
+        'CREATE INDEX idx_basicuserdata_task ON BasicUserData (task)',
+    )),
+    # 4: 中断的计时不再删除，而是标记状态并保留结束时间；结束时间等于开始时间的旧记录视为中断
+    (4, (
+        AddColumn('BasicUserData', 'status', "VARCHAR(16) NOT NULL DEFAULT 'finished'"),
+        "UPDATE BasicUserData SET status = 'interrupted' WHERE terminate_time = start_time",
+    )),
+    # 5: 记录计时模式，并建立按天和按任务的统计汇总表，打开统计面板时不再扫描全部计时记录
+    (5, (
+        AddColumn('BasicUserData', 'mode', 'INTEGER NOT NULL DEFAULT 1'),
+        "UPDATE BasicUserData SET mode = 0 WHERE task = 'Relaxing'",
+        '''
+        CREATE TABLE DailyRollup
+        (
+            day DATE PRIMARY KEY,
+            focus_seconds INTEGER NOT NULL DEFAULT 0,
+            relax_seconds INTEGER NOT NULL DEFAULT 0,
+            sessions_finished INTEGER NOT NULL DEFAULT 0,
+            sessions_interrupted INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE TaskRollup
+        (
+            task VARCHAR(255) PRIMARY KEY,
+            focus_seconds INTEGER NOT NULL DEFAULT 0,
+            sessions_finished INTEGER NOT NULL DEFAULT 0,
+            sessions_interrupted INTEGER NOT NULL DEFAULT 0,
+            last_day DATE
+        )
+        ''',
+        DAILY_ROLLUP_UPSERT.format(where='1'),
+        TASK_ROLLUP_UPSERT.format(where='1'),
+    )),
+    # 6: 任务完成或移出清单时只标记ToDoList.is_finished，不再删除，计时记录始终保留task_id
+    # 外键去掉ON DELETE SET NULL，误删仍被引用的任务会报错，而不是悄悄断开关联
+    # 版本3~5期间删除任务被置空的task_id按任务名称重新关联，没有同名任务时补建一条已完成的任务
+    (6, (
+        '''
+        INSERT INTO ToDoList (is_finished, task)
+        SELECT DISTINCT 1, b.task FROM BasicUserData b
+        WHERE b.task_id IS NULL AND b.mode = 1 AND b.task IS NOT NULL AND b.task != 'None'
+            AND NOT EXISTS (SELECT 1 FROM ToDoList t WHERE t.task = b.task)
+        ''',
+        '''
+        CREATE TABLE BasicUserData_v6
+        (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER REFERENCES ToDoList (id),
+            task VARCHAR(255),
+            start_time DATETIME NOT NULL DEFAULT current_timestamp,
+            terminate_time DATETIME NOT NULL DEFAULT current_timestamp,
+            duration INTEGER NOT NULL,
+            status VARCHAR(16) NOT NULL DEFAULT 'finished',
+            mode INTEGER NOT NULL DEFAULT 1
+        )
+        ''',
+        '''
+        INSERT INTO BasicUserData_v6 (id, task_id, task, start_time, terminate_time, duration, status, mode)
+        SELECT
+            b.id,
+            CASE WHEN b.task_id IS NOT NULL OR b.mode != 1 THEN b.task_id
+                ELSE (SELECT t.id FROM ToDoList t WHERE t.task = b.task ORDER BY t.id LIMIT 1) END,
+            b.task, b.start_time, b.terminate_time, b.duration, b.status, b.mode
+        FROM BasicUserData b
+        ORDER BY b.id
+        ''',
+        'DROP TABLE BasicUserData',
+        'ALTER TABLE BasicUserData_v6 RENAME TO BasicUserData',
+        'CREATE INDEX idx_basicuserdata_task_id_start ON BasicUserData (task_id, start_time)',
+        'CREATE INDEX idx_basicuserdata_task ON BasicUserData (task)',
+    )),
+)
+
+# ToDoList.is_finished 的取值
+TASK_OPEN = 0
+TASK_FINISHED = 1  # 计时完成后移出清单
+TASK_REMOVED = 2  # 未完成时手动移出清单
+
+# BasicUserData.status 的取值
+STATUS_RUNNING = 'running'
+STATUS_FINISHED = 'finished'
+STATUS_INTERRUPTED = 'interrupted'
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate(adapter, logger=None, target=SCHEMA_VERSION):
+    # adapter需提供 user_version() / set_user_version(v) / columns(table) / execute(sql) / transaction()
+    # target为要迁移到的版本，默认为最新版本；返回本次应用的迁移版本列表
+    applied = []
+    current = adapter.user_version()
+    for version, steps in MIGRATIONS:
+        if version <= current or version > target:
+            continue
+        with adapter.transaction():
+            for step in steps:
+                if isinstance(step, AddColumn):
+                    if step.column in adapter.columns(step.table):
+                        continue
+                    adapter.execute('ALTER TABLE %s ADD COLUMN %s %s' % (step.table, step.column, step.ddl))
+                else:
+                    adapter.execute(step)
+            adapter.set_user_version(version)
+        applied.append(version)
+        if logger is not None:
+            logger.debug('数据库已迁移到版本%d', version)
+    return applied
+
+
+class Sqlite3Adapter:
+    # 供基准测试和脚本使用的sqlite3适配器
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.conn.isolation_level = None  # 由transaction()显式管理事务
+
+    def user_version(self) -> int:
+        return self.conn.execute('PRAGMA user_version').fetchone()[0]
+
+    def set_user_version(self, version):
+        self.conn.execute('PRAGMA user_version = %d' % version)
+
+    def columns(self, table):
+        return [row[1] for row in self.conn.execute('PRAGMA table_info(%s)' % table)]
+
+    def execute(self, sql):
+        self.conn.execute(sql)
+
+    def transaction(self):
+        return _Sqlite3Transaction(self.conn)
+
+
+class _Sqlite3Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN')
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type is not None else 'COMMIT')
+        return False
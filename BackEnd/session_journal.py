@@ -0,0 +1,75 @@
+import glob
+import json
+import os
+
+JOURNAL_FILE_NAME = 'session_journal.jsonl'
+
+
+class SessionJournal:
+    # 计时事件的追加写日志，每个事件一行JSON，写入后立即交给操作系统，进程被杀死也不会丢失
+    # 事件先保存在内存中，定期批量写入数据库；take()把当前文件改名为段文件，数据库提交后由调用方删除
+
+    def __init__(self, folder):
+        self.path = folder + '//' + JOURNAL_FILE_NAME
+        self._file = None
+        self._buffer = []
+        # 上次运行恢复失败时会留下段文件，新段的序号接在其后，不能覆盖未写入数据库的事件
+        segments = self._segments()
+        self._segment = int(segments[-1].rsplit('.', 1)[1]) + 1 if segments else 1
+
+    def append(self, event):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(event, ensure_ascii=False) + '\n')
+        self._file.flush()
+        self._buffer.append(event)
+
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def take(self):
+        # 返回(事件列表, 段文件路径)，没有待写入的事件时返回([], None)
+        if not self._buffer:
+            return [], None
+        self._file.close()
+        self._file = None
+        segment = '%s.%d' % (self.path, self._segment)
+        self._segment += 1
+        os.replace(self.path, segment)
+        events, self._buffer = self._buffer, []
+        return events, segment
+
+    def _segments(self):
+        # 已有的段文件，按序号排列
+        segments = glob.glob(glob.escape(self.path) + '.*')
+        segments = [p for p in segments if p.rsplit('.', 1)[1].isdigit()]
+        segments.sort(key=lambda p: int(p.rsplit('.', 1)[1]))
+        return segments
+
+    def leftovers(self):
+        # 上次运行未写入数据库的事件，返回(事件列表, 文件路径列表)，按写入顺序排列
+        segments = self._segments()
+        if os.path.exists(self.path):
+            segments.append(self.path)
+        events = []
+        for path in segments:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:  # 进程在写入一行的中途被杀死
+                        continue
+        return events, segments
+
+    @staticmethod
+    def discard(paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
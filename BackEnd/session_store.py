@@ -0,0 +1,187 @@
+import datetime
+from functools import partial
+
+from BackEnd.db_manager import DBManager
+from BackEnd.schema import STATUS_RUNNING, STATUS_FINISHED, STATUS_INTERRUPTED
+from BackEnd.session_journal import SessionJournal
+from BackEnd.statistics import StatisticsEngine
+from BackEnd.timer_engine import SessionStore
+from Log.my_logger import get_logger
+
+
+JOURNAL_FLUSH_INTERVAL = 30  # 秒，计时事件批量写入数据库的间隔，计时进行中每次写入前追加一条心跳
+
+
+def _utc_now() -> str:
+    # 与SQLite的datetime('now')格式一致
+    return datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
+
+class SqlSessionStore(SessionStore):
+    # 将计时记录写入BasicUserData
+    # 开始和结束事件先追加到日志文件，每隔JOURNAL_FLUSH_INTERVAL秒或退出时由后台数据库线程在一个事务中批量写入
+    # 启动时先写入上次运行遗留的事件，仍未结束的计时标记为中断；计时记录id在本地分配
+    # 计时进行中的记录，terminate_time保存最近一次心跳的时间
+
+    def __init__(self, db=None, worker=None, journal=None):
+        self.db = db if db is not None else DBManager.instance()
+        self.worker = worker
+        self.journal = journal if journal is not None else SessionJournal(self.db.folder)
+        self._running = None  # 进行中的计时记录id
+        self._logger_init()
+        leftover_id = self._recover()
+        self._next_id = max(self._load_next_id(), leftover_id + 1)
+
+    def _logger_init(self):
+        self.logger = get_logger(
+            name=__name__
+        )
+        self.logger.debug('Logger初始化')
+
+    def _load_next_id(self) -> int:
+        # 跳过已删除记录用过的AUTOINCREMENT序号
+        rows = self.db.fetch_all(
+            '''
+            SELECT MAX(
+                IFNULL((SELECT seq FROM sqlite_sequence WHERE name = 'BasicUserData'), 0),
+                IFNULL((SELECT MAX(id) FROM BasicUserData), 0)
+            )
+            '''
+        )
+        return (rows[0][0] if rows else 0) + 1
+
+    def _recover(self) -> int:
+        # 启动时在界面线程的连接上同步执行，之后才分配新的计时记录id
+        # 返回遗留事件中最大的计时记录id；写入失败时段文件保留到下次启动，新计时不能复用这些id
+        events, paths = self.journal.leftovers()
+        leftover_id = max((event.get('id') or 0 for event in events), default=0)
+        conn = self.db.connection()
+        conn.transaction()
+        self._apply_events(self.db, events)
+        # 进程在计时中途被杀死，结束时间取最后一次心跳与计划结束时间中较早的一个，崩溃后的时间不计入
+        running = [row[0] for row in self.db.fetch_all(
+            'SELECT id FROM BasicUserData WHERE status = :status', {'status': STATUS_RUNNING}
+        )]
+        statistics = StatisticsEngine(self.db.fetch_all, self.db.execute)
+        for session_id in running:
+            self.db.execute(
+                '''
+                UPDATE BasicUserData SET
+                    terminate_time = MIN(
+                        MAX(terminate_time, start_time), datetime(start_time, '+' || duration || ' seconds')
+                    ),
+                    status = :status
+                WHERE id = :id
+                ''',
+                {'status': STATUS_INTERRUPTED, 'id': session_id}
+            )
+            statistics.apply_session(session_id)
+        if conn.commit():
+            self.journal.discard(paths)
+        if events or running:
+            self.logger.info('恢复计时事件%d条, 未结束的计时%d条已标记为中断', len(events), len(running))
+        return leftover_id
+
+    def _apply_events(self, db, events):
+        # 重复写入同一事件不会产生影响，段文件删除前进程退出也可以安全地重放
+        statistics = StatisticsEngine(db.fetch_all, db.execute)
+        for event in events:
+            if event['event'] == 'start':
+                db.execute(
+                    '''
+                    INSERT OR IGNORE INTO BasicUserData
+                        (id, task_id, task, duration, status, mode, start_time, terminate_time)
+                    VALUES (
+                        :id, (SELECT id FROM ToDoList WHERE id = :task_id), :task, :duration, :status, :mode, :ts, :ts
+                    )
+                    ''',
+                    {
+                        'id': event['id'],
+                        'task_id': event['task_id'],
+                        'task': event['task'],
+                        'duration': event['duration'],
+                        'status': STATUS_RUNNING,
+                        'mode': event['mode'],
+                        'ts': event['ts'],
+                    }
+                )
+            elif event['event'] == 'end':
+                db.execute(
+                    '''
+                    UPDATE BasicUserData SET terminate_time = :ts, status = :status
+                    WHERE id = :id AND status = :running
+                    ''',
+                    {'ts': event['ts'], 'status': event['status'], 'id': event['id'], 'running': STATUS_RUNNING}
+                )
+                if db.fetch_all('SELECT changes()')[0][0]:
+                    statistics.apply_session(event['id'])  # 增量更新统计汇总表
+            elif event['event'] == 'heartbeat':
+                db.execute(
+                    'UPDATE BasicUserData SET terminate_time = :ts WHERE id = :id AND status = :running',
+                    {'ts': event['ts'], 'id': event['id'], 'running': STATUS_RUNNING}
+                )
+
+    def _write(self, events, segment, db):
+        # 有后台线程时在后台线程中执行，db为后台连接
+        conn = db.connection()
+        conn.transaction()
+        self._apply_events(db, events)
+        if conn.commit():
+            self.journal.discard([segment])
+            self.logger.debug('计时事件写入%d条', len(events))
+        else:
+            self.logger.warning('计时事件写入失败, 保留%s待下次启动恢复', segment)
+
+    def flush(self, callback=None):
+        # 定时器和退出时调用；callback在写入完成后于界面线程调用，用于刷新依赖这些记录的界面
+        if self._running is not None:
+            self.journal.append({'event': 'heartbeat', 'id': self._running, 'ts': _utc_now()})
+        events, segment = self.journal.take()
+        if not events:
+            if callback is not None:
+                callback(None)
+            return
+        if self.worker is None:
+            self._write(events, segment, self.db)
+            if callback is not None:
+                callback(None)
+        else:
+            self.worker.submit(partial(self._write, events, segment), callback)
+
+    def close(self):
+        self.flush()
+        self.journal.close()
+
+    def session_started(self, task, duration, mode, task_id=None):
+        session_id = self._next_id
+        self._next_id += 1
+        self.journal.append({
+            'event': 'start',
+            'id': session_id,
+            'task_id': task_id,
+            'task': task,
+            'duration': duration,
+            'mode': mode,
+            'ts': _utc_now(),
+        })
+        self._running = session_id
+        return session_id
+
+    def session_finished(self, session_id, task, mode):
+        self._end_session(session_id, STATUS_FINISHED)
+
+    def session_interrupted(self, session_id, task, mode):
+        # 中途放弃的计时保留记录并标记为中断，便于统计
+        self._end_session(session_id, STATUS_INTERRUPTED)
+
+    def _end_session(self, session_id, status):
+        if session_id is None:
+            return
+        if session_id == self._running:
+            self._running = None
+        self.journal.append({
+            'event': 'end',
+            'id': session_id,
+            'status': status,
+            'ts': _utc_now(),
+        })
@@ -0,0 +1,98 @@
+import datetime
+
+from BackEnd.schema import DAILY_ROLLUP_UPSERT, TASK_ROLLUP_UPSERT
+
+
+class StatisticsEngine:
+    # 基于汇总表的统计查询，计时结束时增量更新汇总表，查询开销只与显示的天数有关
+    # fetch_all(sql, params) 返回行元组列表，execute(sql, params) 执行写入，params为不带冒号的命名参数
+
+    def __init__(self, fetch_all, execute):
+        self.fetch_all = fetch_all
+        self.execute = execute
+
+    def apply_session(self, session_id):
+        # 计时结束或中断后调用一次，把该条记录累加到汇总表
+        params = {'id': session_id}
+        self.execute(DAILY_ROLLUP_UPSERT.format(where='id = :id'), params)
+        self.execute(TASK_ROLLUP_UPSERT.format(where='id = :id'), params)
+
+    def daily(self, days=7, today=None):
+        # 最近days天每天的专注、休息秒数和完成、中断次数，没有记录的日期补零
+        today = today or datetime.date.today()
+        first = today - datetime.timedelta(days=days - 1)
+        rows = self.fetch_all(
+            '''
+            SELECT day, focus_seconds, relax_seconds, sessions_finished, sessions_interrupted
+            FROM DailyRollup WHERE day BETWEEN :first AND :last ORDER BY day
+            ''',
+            {'first': first.isoformat(), 'last': today.isoformat()}
+        )
+        by_day = {row[0]: row for row in rows}
+        result = []
+        for i in range(days):
+            day = (first + datetime.timedelta(days=i)).isoformat()
+            result.append(by_day.get(day, (day, 0, 0, 0, 0)))
+        return result
+
+    def weekly(self, weeks=4, today=None):
+        # 按周(周一开始)汇总，返回(周一日期, 专注秒数, 休息秒数, 完成次数, 中断次数)
+        today = today or datetime.date.today()
+        monday = today - datetime.timedelta(days=today.weekday())
+        first = monday - datetime.timedelta(weeks=weeks - 1)
+        totals = {}
+        for day, focus, relax, finished, interrupted in self.daily((today - first).days + 1, today):
+            week = datetime.date.fromisoformat(day)
+            week = (week - datetime.timedelta(days=week.weekday())).isoformat()
+            total = totals.setdefault(week, [0, 0, 0, 0])
+            total[0] += focus
+            total[1] += relax
+            total[2] += finished
+            total[3] += interrupted
+        return [(week,) + tuple(total) for week, total in sorted(totals.items())]
+
+    def per_task(self, limit=20):
+        return self.fetch_all(
+            '''
+            SELECT task, focus_seconds, sessions_finished, sessions_interrupted, last_day
+            FROM TaskRollup ORDER BY focus_seconds DESC LIMIT :limit
+            ''',
+            {'limit': limit}
+        )
+
+    def completion_rate(self, days=30, today=None):
+        finished = 0
+        interrupted = 0
+        for _, _, _, f, i in self.daily(days, today):
+            finished += f
+            interrupted += i
+        if finished + interrupted == 0:
+            return None
+        return finished / (finished + interrupted)
+
+    def streak(self, today=None):
+        # 截至今天(今天还没有专注记录时截至昨天)连续有专注时间的天数，只读取连续段内的汇总行
+        today = today or datetime.date.today()
+        expected = today
+        count = 0
+        before = (today + datetime.timedelta(days=1)).isoformat()
+        batch = 64
+        while True:
+            rows = self.fetch_all(
+                '''
+                SELECT day FROM DailyRollup WHERE focus_seconds > 0 AND day < :before
+                ORDER BY day DESC LIMIT :limit
+                ''',
+                {'before': before, 'limit': batch}
+            )
+            for (day,) in rows:
+                day = datetime.date.fromisoformat(day)
+                if count == 0 and day == today - datetime.timedelta(days=1):
+                    expected = day
+                if day != expected:
+                    return count
+                count += 1
+                expected = day - datetime.timedelta(days=1)
+            if len(rows) < batch:
+                return count
+            before = rows[-1][0]
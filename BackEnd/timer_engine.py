@@ -0,0 +1,167 @@
+import math
+import time
+
+WORKING = 1
+RELAXING = 0
+
+# 引擎对外发布的事件
+EVENT_START = 'start'
+EVENT_STOP = 'stop'
+EVENT_TICK = 'tick'
+EVENT_TERMINATE = 'terminate'
+EVENTS = (EVENT_START, EVENT_STOP, EVENT_TICK, EVENT_TERMINATE)
+
+
+def int2time(time):
+    h = time / 60 / 60
+    m = time % 3600 / 60
+    s = time % 60
+    return int(h), int(m), int(s)
+
+
+def format_time(time) -> str:
+    return "%02d:%02d:%02d" % int2time(time)
+
+
+class DriftHistogram:
+    # 统计每次tick相对下一个应到达的整秒边界的延迟(毫秒)，用于验证高负载下的计时精度
+    # 超过1000ms说明有tick被合并，显示值跳过了至少一秒
+    BOUNDS_MS = (10, 50, 100, 250, 500, 1000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.total = 0
+        self.max_ms = 0.0
+        self.sum_ms = 0.0
+
+    def add(self, drift_ms):
+        i = 0
+        while i < len(self.BOUNDS_MS) and drift_ms >= self.BOUNDS_MS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += 1
+        self.sum_ms += drift_ms
+        if drift_ms > self.max_ms:
+            self.max_ms = drift_ms
+
+    def reset(self):
+        self.__init__()
+
+    def snapshot(self) -> dict:
+        labels = []
+        lower = 0
+        for bound in self.BOUNDS_MS:
+            labels.append('%d-%dms' % (lower, bound))
+            lower = bound
+        labels.append('>=%dms' % lower)
+        return {
+            'buckets': dict(zip(labels, self.counts)),
+            'total': self.total,
+            'max_ms': self.max_ms,
+            'mean_ms': self.sum_ms / self.total if self.total else 0.0,
+        }
+
+
+class SessionStore:
+    # 计时记录持久化接口，默认不做任何持久化，便于脱离数据库测试
+
+    def session_started(self, task, duration, mode, task_id=None):
+        # 返回本次计时记录的标识，交由引擎在结束或中断时回传
+        return None
+
+    def session_finished(self, session_id, task, mode):
+        pass
+
+    def session_interrupted(self, session_id, task, mode):
+        pass
+
+
+class TimerEngine:
+    # 与界面无关的倒计时状态机，界面、小窗口和托盘通过subscribe订阅事件
+    # 剩余时间由单调时钟上的截止时刻计算，tick只负责刷新显示，迟到或合并的tick不会累积误差
+
+    def __init__(self, store=None, clock=time.monotonic):
+        self.store = store if store is not None else SessionStore()
+        self.clock = clock
+        self.is_timing = False  # 计时状态变量
+        self.duration = 0  # 最近一次显示的剩余计时时间
+        self.deadline = None
+        self._next_due = None  # 显示值下一次应变化的时刻
+        self.drift = DriftHistogram()
+        self.mode = WORKING
+        self.task = None
+        self.session_id = None
+        self.tick_count = 0
+        self._subscribers = {event: [] for event in EVENTS}
+
+    def subscribe(self, event, callback):
+        self._subscribers[event].append(callback)
+
+    def unsubscribe(self, event, callback):
+        self._subscribers[event].remove(callback)
+
+    def _emit(self, event, *args):
+        for callback in self._subscribers[event]:
+            callback(*args)
+
+    def remaining(self) -> int:
+        # 向上取整，保证显示值在对应的整秒边界到来时才减少
+        if not self.is_timing:
+            return self.duration
+        return max(0, math.ceil(self.deadline - self.clock()))
+
+    def next_wakeup_delay(self, visible):
+        # 距下一次需要tick的秒数: 有界面显示时唤醒到下一个整秒边界，否则直接睡到截止时刻
+        if not self.is_timing:
+            return None
+        left = self.deadline - self.clock()
+        if left <= 0:
+            return 0.0
+        if not visible:
+            return left
+        return left - (math.ceil(left) - 1)
+
+    def start(self, duration, mode, task, task_id=None):
+        # start: (duration, mode, task)
+        self.duration = int(duration)
+        self.deadline = self.clock() + self.duration
+        self._next_due = self.deadline - self.duration + 1
+        self.mode = mode
+        self.task = task
+        self.is_timing = True
+        self.drift.reset()  # 漂移统计和唤醒次数按单次计时统计，结束后仍可读取
+        self.tick_count = 0
+        self.session_id = self.store.session_started(task, self.duration, mode, task_id)
+        self._emit(EVENT_START, self.duration, mode, task)
+
+    def tick(self):
+        # tick: (remaining, mode)，仅在显示值变化时发布，剩余时间归零时触发terminate
+        if not self.is_timing:
+            return
+        self.tick_count += 1
+        now = self.clock()
+        remaining = max(0, math.ceil(self.deadline - now))
+        if remaining != self.duration:
+            # 剩余r秒的显示值应在 deadline - r 时刻出现，提前到达的tick不计入
+            self.drift.add(max(0.0, now - self._next_due) * 1000)
+            self._next_due = self.deadline - remaining + 1
+            self.duration = remaining
+            self._emit(EVENT_TICK, remaining, self.mode)
+        if remaining <= 0:
+            self._terminate()
+
+    def stop(self):
+        # 中途放弃, stop: (task, mode)
+        if not self.is_timing:
+            return
+        self.is_timing = False
+        self.store.session_interrupted(self.session_id, self.task, self.mode)
+        self.session_id = None
+        self._emit(EVENT_STOP, self.task, self.mode)
+
+    def _terminate(self):
+        # terminate: (task, mode)
+        self.is_timing = False  # 更新标志，计时结束
+        self.store.session_finished(self.session_id, self.task, self.mode)
+        self.session_id = None
+        self._emit(EVENT_TERMINATE, self.task, self.mode)
@@ -0,0 +1,126 @@
+# 对比统计面板读取全部计时记录的几种方式: 逐个单元格读取QSqlQuery、sqlite3的fetchall、np.fromiter，
+# 以及数据版本未变时直接取缓存、有新记录时的增量读取
+# 用法(在仓库根目录): python -m Benchmark.bench_analytics [sessions]
+import os
+import sys
+import time
+import random
+import sqlite3
+import datetime
+import tempfile
+
+import numpy as np
+
+from BackEnd.analytics import SessionAnalytics, SESSION_COLUMNS_QUERY, SESSION_DTYPE
+from BackEnd.schema import migrate, Sqlite3Adapter
+
+
+class _Path:
+    # SessionAnalytics只需要连接管理器的db_path
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+
+_TASKS = 50
+
+
+def _fill_tasks(conn):
+    # 一半任务已完成，按任务统计同样包括它们
+    conn.executemany(
+        'INSERT INTO ToDoList (id, is_finished, task) VALUES (?, ?, ?)',
+        [(i, i % 2, 'task%d' % i) for i in range(1, _TASKS + 1)]
+    )
+    conn.commit()
+
+
+def _fill(conn, sessions, first_id=1):
+    rng = random.Random(first_id)
+    start = datetime.datetime(2016, 1, 1, 8)
+    rows = []
+    for i in range(first_id, first_id + sessions):
+        begin = start + datetime.timedelta(hours=i // 3, minutes=rng.randrange(60))
+        mode = 0 if rng.random() < 0.2 else 1
+        task_id = None if mode == 0 else rng.randrange(1, _TASKS + 1)
+        duration = rng.choice((900, 1500, 1800, 3600)) if mode else 300
+        status = 'interrupted' if rng.random() < 0.15 else 'finished'
+        elapsed = duration if status == 'finished' else rng.randrange(duration)
+        rows.append((
+            'Relaxing' if mode == 0 else 'task%d' % task_id,
+            begin.strftime('%Y-%m-%d %H:%M:%S'),
+            (begin + datetime.timedelta(seconds=elapsed)).strftime('%Y-%m-%d %H:%M:%S'),
+            duration, status, mode, task_id,
+        ))
+    conn.execute('BEGIN')
+    conn.executemany(
+        'INSERT INTO BasicUserData (task, start_time, terminate_time, duration, status, mode, task_id) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)', rows
+    )
+    conn.execute('COMMIT')
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def _qt_fetch(db_path):
+    # 原先的做法: DBManager.fetch_all对每行调用next()，对每个单元格调用value()
+    from PyQt5.QtCore import QCoreApplication
+    from PyQt5.QtSql import QSqlDatabase, QSqlQuery
+    app = QCoreApplication.instance() or QCoreApplication([])
+    conn = QSqlDatabase.addDatabase('QSQLITE', 'bench_analytics')
+    conn.setDatabaseName(db_path)
+    conn.open()
+    query = QSqlQuery(conn)
+    query.prepare(SESSION_COLUMNS_QUERY.replace('?', ':last'))
+    query.bindValue(':last', 0)
+    query.exec()
+    rows = []
+    columns = query.record().count()
+    while query.next():
+        rows.append(tuple(query.value(i) for i in range(columns)))
+    data = np.array(rows, dtype=np.int64)
+    query = None
+    conn.close()
+    conn = None
+    QSqlDatabase.removeDatabase('bench_analytics')
+    return data, app
+
+
+def run(sessions=300000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.sqlite')
+        conn = sqlite3.connect(db_path)
+        migrate(Sqlite3Adapter(conn))
+        _fill_tasks(conn)
+        _fill(conn, sessions)
+        results = {'sessions': sessions}
+        try:
+            results['qt_fetch_all_ms'] = _timed(lambda: _qt_fetch(db_path))[0]
+        except ImportError:
+            results['qt_fetch_all_ms'] = None
+        results['sqlite3_fetchall_ms'] = _timed(
+            lambda: np.array(conn.execute(SESSION_COLUMNS_QUERY, (0,)).fetchall(), dtype=np.int64)
+        )[0]
+        results['np_fromiter_ms'] = _timed(
+            lambda: np.fromiter(conn.execute(SESSION_COLUMNS_QUERY, (0,)), dtype=SESSION_DTYPE)
+        )[0]
+
+        analytics = SessionAnalytics()
+        db = _Path(db_path)
+        results['snapshot_cold_ms'] = _timed(lambda: analytics.snapshot(db))[0]
+        results['snapshot_unchanged_ms'] = _timed(lambda: analytics.snapshot(db))[0]
+        _fill(conn, 1, sessions + 1)  # 一次新的计时结束后重新打开面板
+        results['snapshot_one_new_ms'], snapshot = _timed(lambda: analytics.snapshot(db))
+        results['snapshot_sessions'] = snapshot['sessions']
+        results['snapshot_tasks'] = len(snapshot['per_task'])
+        analytics.close()
+        conn.close()
+    return results
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:2]]
+    for key, value in run(*args).items():
+        print('%-24s %s' % (key, value))
@@ -0,0 +1,51 @@
+# 对比整文件readlines与行偏移索引打开日志的开销
+# 用法(在仓库根目录): python -m Benchmark.bench_log_index [size_mb]
+import os
+import sys
+import time
+import tempfile
+
+from Log.log_index import LogIndex, INDEX_SUFFIX
+
+
+def _make_log(path, size_mb):
+    line = '2026-10-18 10:00:00,000 INFO 开始进行 阅读 工作,时长为00:25:00\n'.encode('utf-8')
+    block = line * 10000
+    with open(path, 'wb') as f:
+        for _ in range(size_mb * 1024 * 1024 // len(block) + 1):
+            f.write(block)
+
+
+def open_readlines(path):
+    # 旧实现: 读入全部行并逐行切分
+    with open(path, encoding='utf-8') as f:
+        return [line.split(' ') for line in f.readlines()]
+
+
+def open_index(path):
+    # 新实现: 只建立或读取行偏移索引，首屏读取一块
+    index = LogIndex(path)
+    index.load()
+    index.read_lines(0, 256)
+    return index
+
+
+def run(size_mb=100):
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, '2026-10-18.log')
+    _make_log(path, size_mb)
+    results = {}
+    for label, opener in (('readlines', open_readlines), ('index_cold', open_index), ('index_cached', open_index)):
+        start = time.perf_counter()
+        opener(path)
+        results[label] = (time.perf_counter() - start) * 1000
+    os.remove(path)
+    os.remove(path + INDEX_SUFFIX)
+    os.rmdir(folder)
+    return results
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:2]]
+    for label, ms in run(*args).items():
+        print('%-14s %.1f ms' % (label, ms))
@@ -0,0 +1,69 @@
+# 对比旧的每实例构造LoggerHandler(各自挂StreamHandler)与日志器注册表的启动开销和单条记录开销
+# 用法(在仓库根目录): python -m Benchmark.bench_logger [records]
+import io
+import sys
+import time
+import logging
+
+from Log import my_logger
+
+# 与启动时创建日志器的模块一致: 主界面、托盘、小窗口、两个计时设置面板、数据库、持久化层
+NAMES = (
+    'FrontEnd.InitTAWidget', 'FrontEnd.InitTAWidget', 'FrontEnd.ClockWidget',
+    'FrontEnd.CountSetDialog', 'FrontEnd.CountSetDialog', 'BackEnd.db_manager', 'BackEnd.session_store',
+)
+
+
+class LegacyLoggerHandler(logging.Logger):
+    # 旧实现: 不经过logging.getLogger，每个实例各自构造StreamHandler
+    def __init__(self, name, stream):
+        super().__init__(name)
+        self.setLevel('DEBUG')
+        stream_handler = logging.StreamHandler(stream)
+        stream_handler.setFormatter(logging.Formatter(my_logger.DEFAULT_FORMAT))
+        self.addHandler(stream_handler)
+
+
+def bench_legacy(records, stream):
+    start = time.perf_counter()
+    loggers = [LegacyLoggerHandler(name, stream) for name in NAMES]
+    startup = time.perf_counter() - start
+    return startup, _emit(loggers, records)
+
+
+def bench_registry(records, stream):
+    my_logger.set_default_level('DEBUG')
+    start = time.perf_counter()
+    loggers = [my_logger.get_logger(name) for name in NAMES]
+    startup = time.perf_counter() - start
+    # 将根日志器的控制台输出重定向到内存，避免测量终端速度
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(stream)
+    return startup, _emit(loggers, records)
+
+
+def _emit(loggers, records):
+    start = time.perf_counter()
+    for i in range(records):
+        loggers[i % len(loggers)].debug('剩余时间%d', i)
+    return (time.perf_counter() - start) / records
+
+
+def run(records=20000):
+    results = {}
+    for label, bench in (('legacy', bench_legacy), ('registry', bench_registry)):
+        stream = io.StringIO()
+        startup, per_record = bench(records, stream)
+        results[label] = {
+            'startup_us': startup * 1e6,
+            'per_record_us': per_record * 1e6,
+            'stderr_bytes': len(stream.getvalue()),
+        }
+    return results
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:2]]
+    for label, result in run(*args).items():
+        print(label, result)
@@ -0,0 +1,57 @@
+# 对比旧的pyrcc5编译资源模块与按需加载的预缩放图标文件的启动开销
+# 用法(在仓库根目录):
+#   git show <旧版本>:resources.py > legacy_resources.py
+#   python -m Benchmark.bench_resources [legacy_resources.py]
+import os
+import sys
+import time
+import tracemalloc
+
+ICON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'icons')
+
+
+def _measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def bench_legacy(path):
+    # 只测量解析编译模块本身的开销，不注册到Qt
+    def load():
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        return compile(source, path, 'exec')
+    code, elapsed, peak = _measure(load)
+    return {
+        'source_bytes': os.path.getsize(path),
+        'compile_ms': elapsed * 1000,
+        'peak_kb': peak / 1024,
+    }
+
+
+def bench_icons():
+    # 托盘只会用到一个尺寸，这里按最坏情况读取全部尺寸
+    def load():
+        data = []
+        for name in sorted(os.listdir(ICON_DIR)):
+            if name.endswith('.png'):
+                with open(os.path.join(ICON_DIR, name), 'rb') as f:
+                    data.append(f.read())
+        return data
+    data, elapsed, peak = _measure(load)
+    return {
+        'icon_bytes': sum(len(d) for d in data),
+        'load_ms': elapsed * 1000,
+        'peak_kb': peak / 1024,
+    }
+
+
+if __name__ == '__main__':
+    print('icons', bench_icons())
+    if len(sys.argv) > 1:
+        print('legacy', bench_legacy(sys.argv[1]))
@@ -0,0 +1,53 @@
+# 在offscreen平台下启动TimeArranger直到主界面第一次绘制，把启动报告追加到历史文件中以便跨提交对比
+# 用法(在仓库根目录): python -m Benchmark.bench_startup [runs] [history.jsonl]，默认写入Benchmark/startup_history.jsonl
+import os
+import sys
+import json
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY = os.path.join(ROOT, 'Benchmark', 'startup_history.jsonl')  # 默认历史文件，不纳入版本控制
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_once(app_data):
+    env = dict(os.environ)
+    env['QT_QPA_PLATFORM'] = 'offscreen'
+    env['AppData'] = app_data  # 隔离数据库和日志，避免污染真实用户数据
+    with tempfile.TemporaryDirectory() as tmp:
+        report_path = os.path.join(tmp, 'startup.json')
+        subprocess.run(
+            [sys.executable, os.path.join(ROOT, 'main.py'),
+             '--profile-startup', report_path, '--exit-after-first-paint'],
+            cwd=ROOT, env=env, check=True, timeout=60,
+        )
+        with open(report_path, encoding='utf-8') as f:
+            return json.load(f)
+
+
+def run(runs=3, history=HISTORY):
+    with tempfile.TemporaryDirectory() as app_data:
+        # 第一次启动会创建数据库，单独作为冷启动记录
+        reports = [run_once(app_data) for _ in range(runs)]
+    record = {
+        'commit': _git_commit(),
+        'cold': reports[0],
+        'warm': reports[1:],
+    }
+    with open(history, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    return record
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    runs = int(args[0]) if args else 3
+    history = args[1] if len(args) > 1 else HISTORY
+    print(json.dumps(run(runs, history), ensure_ascii=False, indent=2))
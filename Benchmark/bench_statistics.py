@@ -0,0 +1,109 @@
+# 用百万条模拟计时记录对比直接扫描BasicUserData与读取汇总表的统计开销
+# 用法(在仓库根目录): python -m Benchmark.bench_statistics [sessions]
+import os
+import sys
+import time
+import random
+import sqlite3
+import datetime
+import tempfile
+
+from BackEnd.schema import migrate, Sqlite3Adapter, SESSION_SECONDS
+from BackEnd.statistics import StatisticsEngine
+
+TODAY = datetime.date(2024, 6, 30)
+
+
+def _fill(conn, sessions):
+    # 约10年的历史，每天若干次计时，50个任务；按版本4的结构写入，休息记录的任务名为Relaxing，由版本5的迁移推断mode
+    rng = random.Random(0)
+    days = 3650
+    start = datetime.datetime.combine(TODAY - datetime.timedelta(days=days), datetime.time(8))
+    rows = []
+    for i in range(sessions):
+        begin = start + datetime.timedelta(seconds=int(i * days * 86400 / sessions))
+        mode = 0 if rng.random() < 0.2 else 1
+        duration = rng.choice((900, 1500, 1800, 3600)) if mode else 300
+        status = 'interrupted' if rng.random() < 0.15 else 'finished'
+        elapsed = duration if status == 'finished' else rng.randrange(duration)
+        rows.append((
+            None if mode == 0 else rng.randrange(1, 51),
+            'Relaxing' if mode == 0 else 'task%d' % rng.randrange(50),
+            begin.strftime('%Y-%m-%d %H:%M:%S'),
+            (begin + datetime.timedelta(seconds=elapsed)).strftime('%Y-%m-%d %H:%M:%S'),
+            duration, status,
+        ))
+    conn.execute('BEGIN')
+    conn.executemany(
+        'INSERT INTO BasicUserData (task_id, task, start_time, terminate_time, duration, status) '
+        'VALUES (?, ?, ?, ?, ?, ?)', rows
+    )
+    conn.execute('COMMIT')
+
+
+def _timed(func, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def scan_daily(conn, days=14):
+    # 无汇总表时的做法: 每次打开面板都按天聚合原始记录
+    first = (TODAY - datetime.timedelta(days=days - 1)).isoformat()
+    return conn.execute(
+        '''
+        SELECT date(start_time, 'localtime') AS day,
+            SUM(CASE WHEN mode = 1 THEN %s ELSE 0 END), SUM(CASE WHEN mode = 0 THEN %s ELSE 0 END),
+            SUM(status = 'finished'), SUM(status = 'interrupted')
+        FROM BasicUserData WHERE status != 'running' AND date(start_time, 'localtime') >= ?
+        GROUP BY day ORDER BY day
+        ''' % (SESSION_SECONDS, SESSION_SECONDS), (first,)
+    ).fetchall()
+
+
+def scan_per_task(conn):
+    return conn.execute(
+        '''
+        SELECT task, SUM(%s) AS secs, SUM(status = 'finished'), SUM(status = 'interrupted')
+        FROM BasicUserData WHERE mode = 1 AND status != 'running' GROUP BY task ORDER BY secs DESC LIMIT 20
+        ''' % SESSION_SECONDS
+    ).fetchall()
+
+
+def run(sessions=1000000):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, 'bench.sqlite'))
+        # 先建到版本4(无mode列和汇总表)，填充数据后迁移到版本5，测量添加mode列和一次性回填汇总表的耗时
+        adapter = Sqlite3Adapter(conn)
+        migrate(adapter, target=4)
+        _fill(conn, sessions)
+        start = time.perf_counter()
+        migrate(adapter, target=5)
+        backfill_ms = (time.perf_counter() - start) * 1000
+        migrate(adapter)
+
+        stats = StatisticsEngine(
+            lambda sql, params=None: conn.execute(sql, params or {}).fetchall(),
+            lambda sql, params=None: conn.execute(sql, params or {}),
+        )
+        results = {
+            'sessions': sessions,
+            'rollup_backfill_ms': backfill_ms,
+            'scan_daily_ms': _timed(lambda: scan_daily(conn))[0],
+            'rollup_daily_ms': _timed(lambda: stats.daily(14, TODAY))[0],
+            'scan_per_task_ms': _timed(lambda: scan_per_task(conn))[0],
+            'rollup_per_task_ms': _timed(lambda: stats.per_task())[0],
+            'rollup_weekly_ms': _timed(lambda: stats.weekly(4, TODAY))[0],
+            'rollup_streak_ms': _timed(lambda: stats.streak(TODAY))[0],
+        }
+        last_id = conn.execute('SELECT MAX(id) FROM BasicUserData').fetchone()[0]
+        results['apply_session_ms'] = _timed(lambda: stats.apply_session(last_id), repeat=100)[0]
+        conn.close()
+    return results
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:2]]
+    for key, value in run(*args).items():
+        print('%-20s %s' % (key, value))
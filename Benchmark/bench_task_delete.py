@@ -0,0 +1,59 @@
+# 对比旧的按行号删除并重排后续id与当前按稳定id标记移除的开销
+# 用法(在仓库根目录): python -m Benchmark.bench_task_delete [tasks] [deletes]
+import sys
+import time
+import random
+import sqlite3
+
+from BackEnd.schema import migrate, Sqlite3Adapter, TASK_OPEN, TASK_REMOVED
+
+
+def _make_db(tasks):
+    conn = sqlite3.connect(':memory:')
+    migrate(Sqlite3Adapter(conn))
+    conn.executemany(
+        'INSERT INTO ToDoList (task, is_finished) VALUES (?, ?)',
+        (('task%d' % i, TASK_OPEN) for i in range(1, tasks + 1))
+    )
+    conn.commit()
+    return conn
+
+
+def _load_ids(conn):
+    # 与FrontEnd.TaskListModel.load相同，列表中的id在加载时读取一次
+    return [row[0] for row in conn.execute('SELECT id FROM ToDoList WHERE is_finished = ? ORDER BY id', (TASK_OPEN,))]
+
+
+def delete_renumber(conn, ids, row):
+    # 旧实现: id = row + 1，删除后后续所有行的主键减一
+    conn.execute('DELETE FROM ToDoList WHERE id = ?', (row + 1,))
+    conn.execute('UPDATE ToDoList SET id = id - 1 WHERE id > ?', (row + 1,))
+    conn.execute('UPDATE sqlite_sequence SET seq = seq - 1  WHERE name = "ToDoList"')
+    conn.commit()
+
+
+def delete_by_id(conn, ids, row):
+    # 当前实现(FrontEnd.TaskListModel.remove_row): id取自模型的列表，只更新一行的状态
+    task_id = ids.pop(row)
+    conn.execute('UPDATE ToDoList SET is_finished = ? WHERE id = ?', (TASK_REMOVED, task_id))
+    conn.commit()
+
+
+def run(tasks=100000, deletes=50):
+    rows = [random.Random(i).randrange(tasks // 10) for i in range(deletes)]  # 删除靠前的任务，后续行最多
+    results = {}
+    for label, delete in (('renumber', delete_renumber), ('by_id', delete_by_id)):
+        conn = _make_db(tasks)
+        ids = _load_ids(conn)
+        start = time.perf_counter()
+        for row in rows:
+            delete(conn, ids, row)
+        results[label] = (time.perf_counter() - start) / deletes * 1000
+        conn.close()
+    return results
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:3]]
+    for label, ms in run(*args).items():
+        print('%-10s %.3f ms/delete' % (label, ms))
@@ -0,0 +1,64 @@
+# 脱离界面驱动TimerEngine，统计模拟计时的吞吐量和单次tick开销
+# 用法(在仓库根目录): python -m Benchmark.bench_timer_engine [sessions] [duration]
+import sys
+import time
+
+from BackEnd.timer_engine import TimerEngine, DriftHistogram, WORKING, RELAXING, EVENT_TICK
+
+
+class FakeClock:
+    # 以每次计时开始为基准每秒触发一次，带少量迟到抖动，每100次中有一次被阻塞1.5秒，模拟被模态对话框卡住的事件循环
+    def __init__(self):
+        self.now = 0.0
+        self.base = 0.0
+        self.n = 0
+
+    def __call__(self):
+        return self.now
+
+    def begin(self):
+        self.base = self.now
+        self.n = 0
+
+    def advance(self):
+        self.n += 1
+        if self.n % 100 == 0:
+            self.n += 1
+            self.now = self.base + self.n + 0.5
+        else:
+            self.now = self.base + self.n + (self.n % 7) * 0.013
+
+
+def run(sessions=10000, duration=60):
+    clock = FakeClock()
+    engine = TimerEngine(clock=clock)
+    engine.subscribe(EVENT_TICK, lambda remaining, mode: None)
+    ticks = 0
+    drift = DriftHistogram()  # 引擎每次开始计时时清空统计，这里汇总所有计时
+    start = time.perf_counter()
+    for i in range(sessions):
+        clock.begin()
+        engine.start(duration, WORKING if i % 2 == 0 else RELAXING, 'task%d' % i)
+        while engine.is_timing:
+            clock.advance()
+            engine.tick()
+        ticks += engine.tick_count
+        drift.counts = [a + b for a, b in zip(drift.counts, engine.drift.counts)]
+        drift.total += engine.drift.total
+        drift.sum_ms += engine.drift.sum_ms
+        drift.max_ms = max(drift.max_ms, engine.drift.max_ms)
+    elapsed = time.perf_counter() - start
+    return {
+        'sessions': sessions,
+        'ticks': ticks,
+        'elapsed_s': elapsed,
+        'sessions_per_s': sessions / elapsed,
+        'ns_per_tick': elapsed / ticks * 1e9,
+        'drift': drift.snapshot(),
+    }
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:3]]
+    for key, value in run(*args).items():
+        print('%-16s %s' % (key, value))
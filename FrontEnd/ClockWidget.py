@@ -1,11 +1,14 @@
 from PyQt5 import QtCore
-from PyQt5.QtCore import Qt, QSettings, QPoint
+from PyQt5.QtCore import Qt, QSettings, QPoint, pyqtSignal
 from UI.UI_ClockWidget import Ui_ClockWidget
 from PyQt5.QtWidgets import QWidget, QApplication, QDesktopWidget
-from Log.my_logger import LoggerHandler
+from Log.my_logger import get_logger
+from BackEnd.timer_engine import WORKING, EVENT_START, EVENT_STOP, EVENT_TICK, EVENT_TERMINATE, format_time
 
 
 class ClockWidget(Ui_ClockWidget, QWidget):
+    # 显示状态变化时通知主界面重新安排计时唤醒
+    visibility_changed_signal = pyqtSignal()
 
     e_pos = None  # 记录鼠标事件发生位置
     w_pos = None  # 记录鼠标事件发生时窗口起始位置
@@ -32,8 +35,27 @@ class ClockWidget(Ui_ClockWidget, QWidget):
     def save_settings(self):
         self.setting_manager.setValue('MainWindow/clk_pos', self.pos())
 
+    def subscribe(self, engine):
+        engine.subscribe(EVENT_START, self.on_timing_started)
+        engine.subscribe(EVENT_TICK, self.on_timing_tick)
+        engine.subscribe(EVENT_STOP, self.on_timing_stopped)
+        engine.subscribe(EVENT_TERMINATE, self.on_timing_stopped)
+
+    def on_timing_started(self, duration, mode, task):
+        self.on_timing_tick(duration, mode)
+
+    def on_timing_tick(self, remaining, mode):
+        if mode == WORKING:
+            self.label.setText('工作时间剩余:' + format_time(remaining))
+        else:
+            self.label.setText('休息时间剩余:' + format_time(remaining))
+
+    def on_timing_stopped(self, task, mode):
+        self.label.setText('工作时间剩余:00:00:00')
+        self.close()
+
     def _logger_init(self):
-        self.logger = LoggerHandler(
+        self.logger = get_logger(
             name=__name__
         )
         self.logger.debug('Logger初始化')
@@ -44,6 +66,14 @@ class ClockWidget(Ui_ClockWidget, QWidget):
         size = self.geometry()
         return QPoint(int((screen.width() - size.width()) / 2), int((screen.height() - size.height()) / 2))
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.visibility_changed_signal.emit()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.visibility_changed_signal.emit()
+
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
             self.is_moving = True
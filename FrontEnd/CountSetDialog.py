@@ -1,11 +1,8 @@
 import os
-import sys
-
-from PyQt5.QtSql import QSqlDatabase, QSqlQuery, QSqlQueryModel
 
 from UI.UI_CountSetDialog import Ui_CountSetDialog
-from Log.my_logger import LoggerHandler
-from PyQt5.QtWidgets import QDialog, QDesktopWidget, QMessageBox
+from Log.my_logger import get_logger
+from PyQt5.QtWidgets import QDialog, QDesktopWidget
 from PyQt5.QtCore import QSettings, QPoint, pyqtSignal, Qt
 
 
@@ -14,13 +11,13 @@ class CountSetDialog(Ui_CountSetDialog, QDialog):
     count_down_set_signal = pyqtSignal()
     task_to_be_complete_selected_signal = pyqtSignal(int)
 
-    def __init__(self):
+    def __init__(self, task_model):
         super().__init__()
+        self.task_model = task_model  # 与主界面共享的任务列表模型
         self.setupUi(self)
         self._load_folder()
         self._logger_init()
         self._init_ui()
-        self._init_DB()
         self._init_settings()
 
     def _init_ui(self):
@@ -33,7 +30,6 @@ class CountSetDialog(Ui_CountSetDialog, QDialog):
         self.spinBox_m.setRange(0, 59)
         self.spinBox_s.setRange(0, 59)
         self.init_model_views()
-        self.logger.info('TimeArranger启动')
 
     def _init_settings(self):
         self.setting_manager = QSettings('ShawWalt', 'TimeArranger')
@@ -47,64 +43,20 @@ class CountSetDialog(Ui_CountSetDialog, QDialog):
         self.logger.debug('保存新设置')
 
     def init_model_views(self):
-        self._open_DB()
-        self.model1 = QSqlQueryModel()
-        self.model1.setQuery('SELECT task FROM ToDoList')
-        self.listView_task.setModel(self.model1)
+        self.listView_task.setModel(self.task_model)
         self.listView_task.setCurrentIndex(
-            self.listView_task.model().index(0,0)
+            self.task_model.index(0)
         )
-        self.listView_task.setModelColumn(1)
         self.logger.debug('ModelView加载')
-        self._close_DB()
-
-    def _open_DB(self):
-        # 测试数据库功能
-        self.conn = QSqlDatabase.addDatabase("QSQLITE")
-        self.db_path = self.folder + '//time_arranger.sqlite'
-        self.conn.setDatabaseName(self.db_path)
-        if not self.conn.open():
-            QMessageBox.critical(
-                None,
-                "TimeArranger - 错误!",
-                "数据库连接错误: %s" % self.conn.lastError().databaseText(),
-            )
-            sys.exit(1)
-        self.logger.debug('开启数据库访问')
-
-    def _close_DB(self):
-        self.conn.close()
-        self.logger.debug('关闭数据库访问')
 
     def _load_folder(self):
         self.folder = os.environ['AppData'] + '\\TimeArranger'
         if not os.path.exists(self.folder):
             os.makedirs(self.folder)
 
-    def _init_DB(self):
-        # 创建或连接已有数据库
-        self._open_DB()
-        # 查找数据表
-        query = QSqlQuery()
-        if self._table_exists(self.conn, "ToDoList") is False:
-            query.prepare(
-                '''CREATE TABLE ToDoList 
-                (
-                    "id"  INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL UNIQUE,
-                    "is_finished" INT(1) NOT NULL DEFAULT 0,
-                    "task" VARCHAR(255)
-                );
-                '''
-            )
-            if query.exec() is False:
-                self.logger.debug('ToDo数据表未创建: %s', query.lastError().text())
-            else:
-                self.logger.debug('ToDoList已创建')
-        self._close_DB()
-
     def _logger_init(self):
         # 初始化日志器参数
-        self.logger = LoggerHandler(
+        self.logger = get_logger(
             name=__name__
         )
         self.logger.debug('Logger初始化')
@@ -140,10 +92,3 @@ class CountSetDialog(Ui_CountSetDialog, QDialog):
         screen = QDesktopWidget().screenGeometry()
         size = self.geometry()
         return QPoint(int((screen.width() - size.width()) / 2), int((screen.height() - size.height()) / 2))
-
-    def _table_exists(self, conn, name) -> bool:
-        nlist = conn.tables()
-        if name in nlist:
-            return True
-        else:
-            return False
@@ -1,25 +1,41 @@
+import math
 import os
 import sys
-import resources
+import time
+import logging
+import threading
 from functools import partial
 
 from PyQt5 import QtCore
 from PyQt5.QtGui import QIcon
 
 from UI.UI_InitTAWidget import Ui_InitTAWidget
-from UI.UI_LogWidget import Ui_LogWidget
 from FrontEnd.ClockWidget import ClockWidget
 from FrontEnd.CountSetDialog import CountSetDialog
 from FrontEnd.CopyRight import CopyRight
 from FrontEnd.StatisticsWidget import StatisticsWidget
-from Log.my_logger import LoggerHandler
+from FrontEnd.LazyWidgetFactory import LazyWidgetFactory
+from FrontEnd.TaskListModel import TaskListModel
+from FrontEnd.LogListModel import LogListModel
+from FrontEnd.LogItemDelegate import LogItemDelegate
+from FrontEnd.LogSearchBar import LogSearchBar
+from FrontEnd.LogTail import LogTail
+from BackEnd.db_manager import DBManager
+from BackEnd.db_worker import DBWorker
+from BackEnd.schema import TASK_FINISHED
+from BackEnd.session_store import SqlSessionStore, JOURNAL_FLUSH_INTERVAL
+from BackEnd.statistics import StatisticsEngine
+from BackEnd.timer_engine import TimerEngine, WORKING, RELAXING, EVENT_START, EVENT_STOP, EVENT_TICK, \
+    EVENT_TERMINATE, format_time
+from Log import json_log
+from Log.log_search import LogSearchIndex, SearchIndexHandler
+from Log.rotating import sort_logs, scan_logs
+from Log.my_logger import get_logger, get_default_level, stop_queue_listeners, add_file_companion, \
+    add_archive_listener, current_log_file, wait_log_maintenance
+from Log.tick_telemetry import TickTelemetry
 from PyQt5.QtCore import (QTimer, QSettings, QPoint, QVariant, pyqtSignal, Qt, QSize)
 from PyQt5.QtWidgets import QMainWindow, QDesktopWidget, QMessageBox, QSystemTrayIcon, QMenu, QAction, QInputDialog, \
-    QLineEdit, QPushButton, QWidget, QListWidgetItem
-from PyQt5.QtSql import QSqlDatabase, QSqlQuery, QSqlQueryModel
-
-WORKING = 1
-RELAXING = 0
+    QLineEdit, QPushButton, QWidget, QListView, QVBoxLayout
 
 
 #  系统托盘类
@@ -35,7 +51,7 @@ class TrayIcon(QSystemTrayIcon):
 
     def _logger_init(self):
         # 初始化日志器参数
-        self.logger = LoggerHandler(
+        self.logger = get_logger(
             name=__name__
         )
         self.logger.debug('Logger初始化')
@@ -59,52 +75,95 @@ class TrayIcon(QSystemTrayIcon):
     def quit(self):
         self.quit_signal.emit(0)
 
+    def subscribe(self, engine):
+        engine.subscribe(EVENT_START, self.on_timing_started)
+        engine.subscribe(EVENT_STOP, self.on_timing_stopped)
+        engine.subscribe(EVENT_TERMINATE, self.on_timing_stopped)
+
+    def on_timing_started(self, duration, mode, task):
+        if mode == WORKING:
+            self.setToolTip('TimeArranger - 正在执行任务:%s' % task)
+        else:
+            self.setToolTip('TimeArranger - 休息中')
+
+    def on_timing_stopped(self, task, mode):
+        self.setToolTip('TimeArranger')
 
-class LogWidget(QWidget, Ui_LogWidget):
-    def __init__(self, log_time, log_msg, log_level, parent=None):
-        super(LogWidget, self).__init__(parent)
-        self.setupUi(self)
-        self.log_msg.setText(log_msg)
-        self.log_level.setText(log_level)
-        self.log_time.setText(log_time)
+
+# 预先缩放好的多尺寸托盘图标，按需从文件加载
+ICON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'icons')
+TRAY_ICON_SIZES = (16, 24, 32, 48, 64)
+
+
+def load_tray_icon() -> QIcon:
+    # QIcon.addFile只记录路径，托盘实际需要某个尺寸时才解码对应的文件
+    icon = QIcon()
+    for size in TRAY_ICON_SIZES:
+        icon.addFile(os.path.join(ICON_DIR, 'tray_icon_%d.png' % size), QSize(size, size))
+    return icon
 
 
 class InitTAWidget(Ui_InitTAWidget, QMainWindow):
 
-    statistics_widget = None
     copy_right = None
-    clock_widget = None
-    count_set_dialog = None
     ti = None
+    widgets = None  # 计时设置面板、计时小窗口和数据分析界面在第一次使用时构造
 
     timer = None
     timer_copy_right = None
     setting_manager = None
-
-    # 状态变量
-    is_timing = False  # 计时状态变量
-    duration = 0  # 计时持续时间
+    engine = None  # 计时状态机
+    tick_telemetry = None
+    session_analytics = None  # 第一次打开统计面板时创建
+    _tick_due = None  # 本次唤醒的预定时刻，用于统计tick延迟
 
     # 自定义信号
     count_down_terminate_signal = pyqtSignal()
+    log_list_loaded_signal = pyqtSignal(list)  # 后台扫描日志目录完成
 
     def __init__(self):
         super().__init__()
-        self.count_set_dialog = CountSetDialog()
-        self.setupUi(self)
-        self._load_folder()
-        self._logger_init()
-        self._init_ui()
-        self._init_settings()
-        self._init_DB()
-        self._init_model_views()
-        self._copy_right_init()
-        self._tray_icon_init()
-        self._clock_widget_init()
-        self._count_set_widget_init()
-        self._statistics_widget_init()
-        self._init_mode()
-        self._init_listView_log()
+        self.startup_phases = []  # 启动各阶段耗时(秒)
+        self._run_phase(self.setupUi, self)
+        self._run_phase(self._load_folder)
+        self._run_phase(self._logger_init)
+        self._run_phase(self._init_ui)
+        self._run_phase(self._init_settings)
+        self._run_phase(self._init_DB)
+        self._run_phase(self._init_model_views)
+        self._run_phase(self._copy_right_init)
+        self._run_phase(self._tray_icon_init)
+        self._run_phase(self._lazy_widgets_init)
+        self._run_phase(self._engine_init)
+        self._run_phase(self._init_mode)
+        self._run_phase(self._init_listView_log)
+        self._log_startup_report()
+        self.logger.info('TimeArranger启动')
+
+    def _run_phase(self, phase, *args):
+        start = time.perf_counter()
+        phase(*args)
+        self.startup_phases.append((phase.__name__, time.perf_counter() - start))
+
+    def _log_startup_report(self):
+        total = sum(elapsed for _, elapsed in self.startup_phases)
+        self.logger.debug(
+            '启动耗时%.1fms: %s',
+            total * 1000,
+            ', '.join('%s=%.1fms' % (name, elapsed * 1000) for name, elapsed in self.startup_phases)
+        )
+
+    @property
+    def count_set_dialog(self) -> CountSetDialog:
+        return self.widgets.get('count_set_dialog')
+
+    @property
+    def clock_widget(self) -> ClockWidget:
+        return self.widgets.get('clock_widget')
+
+    @property
+    def statistics_widget(self) -> StatisticsWidget:
+        return self.widgets.get('statistics_widget')
 
     def _init_ui(self):
         # 初始化信号与槽的绑定，界面大小等参数的设置，数据库的的加载等
@@ -138,85 +197,50 @@ class InitTAWidget(Ui_InitTAWidget, QMainWindow):
         self.setting_manager.setValue('MainWindow/mode', self.btn_mode.text())
         self.setting_manager.setValue('MainWindow/win_pos', QVariant(QPoint(self.x(), self.y())))
 
-    def _open_DB(self):
-        self.conn = QSqlDatabase.addDatabase("QSQLITE")
-        self._load_folder()
-        self.db_path = self.folder + '//time_arranger.sqlite'
-        self.conn.setDatabaseName(self.db_path)
-        if not self.conn.open():
-            QMessageBox.critical(
-                None,
-                "TimeArranger - 错误!",
-                "数据库连接错误: %s" % self.conn.lastError().databaseText(),
-            )
-            sys.exit(1)
-        self.logger.debug('开启数据库访问')
-
-    def _close_DB(self):
-        self.conn.close()
-        self.logger.debug('关闭数据库访问')
-
     def _load_folder(self):
         self.folder = os.environ['AppData'] + '\\TimeArranger'
         if not os.path.exists(self.folder):
             os.makedirs(self.folder)
 
     def _init_mode(self):
+        # 计时小窗口的模式相关设置在其构造时应用
         if self.btn_mode.text() == '工作模式':
             self.mode = WORKING
             self.lcdNumber.setStyleSheet('border: 1px solid green; color: green; background: silver;')
-            self.clock_widget.is_relaxing = False
         else:
             self.mode = RELAXING
-            self.clock_widget.setMouseTracking(True)
             self.btn_new_task.setDisabled(True)
             self.btn_rm_task.setDisabled(True)
             self.lcdNumber.setStyleSheet('border: 1px solid blue; color: blue; background: silver;')
-            self.clock_widget.is_relaxing = True
             self.listView.setDisabled(True)
 
     def _init_DB(self):
-        self._open_DB()
-        query = QSqlQuery()
-        if self._table_exists(self.conn, "BasicUserData") is False:
-            query.prepare(
-                '''
-                CREATE TABLE BasicUserData
-                (
-                    start_time DATETIME NOT NULL DEFAULT current_timestamp PRIMARY KEY,
-                    terminate_time DATETIME NOT NULL DEFAULT current_timestamp,
-                    task VARCHAR(255),
-                    duration INTEGER NOT NULL 
-                )
-                '''
-            )  # 默认开始时间和结束时间相等，知道计时结束后更新结束时间，如果遇到中断则视为未完成
-            if query.exec() is False:
-                self.logger.debug('BasicUserData未创建')
-                print(query.lastError().text())
-            else:
-                self.logger.debug('BasicUserData已创建')
-        self._close_DB()
-
-    def _table_exists(self, conn, name) -> bool:
-        nlist = conn.tables()
-        if name in nlist:
-            return True
-        else:
-            return False
+        # 与计时设置面板共享同一个数据库长连接，数据表由迁移框架在第一次打开时创建或升级
+        # 启动后的写入交给后台线程的独立连接，界面线程只保留启动加载和统计面板的只读查询
+        self.db = DBManager.instance(self.folder)
+        self.db.open()
+        self.db_worker = DBWorker(self.folder, self)
 
     def _tray_icon_init(self):
         self.ti = TrayIcon(self)
-        self.ti.setIcon(QIcon(':/icon/tray_icon.jpg'))
+        self.ti.setIcon(load_tray_icon())
         self.ti.quit_signal.connect(self.quit)
         self.ti.hide_signal.connect(self.switch_between_show_n_hide)
         self.ti.show()
         self.logger.debug('托盘图标初始化')
 
-    def _count_set_widget_init(self):
-        self.count_set_dialog = CountSetDialog()
-        self.count_set_dialog.count_down_set_signal.connect(self.count_down_set_signal_triggered)
-        self.count_set_dialog.task_to_be_complete_selected_signal.connect(self.task_to_be_complete_selected_triggered)
+    def _lazy_widgets_init(self):
+        self.widgets = LazyWidgetFactory(self.logger)
+        self.widgets.register('count_set_dialog', self._build_count_set_dialog)
+        self.widgets.register('clock_widget', self._build_clock_widget)
+        self.widgets.register('statistics_widget', self._build_statistics_widget)
+
+    def _build_count_set_dialog(self) -> CountSetDialog:
+        count_set_dialog = CountSetDialog(self.model_task)
+        count_set_dialog.count_down_set_signal.connect(self.count_down_set_signal_triggered)
+        count_set_dialog.task_to_be_complete_selected_signal.connect(self.task_to_be_complete_selected_triggered)
         self.logger.debug('计时设置面板初始化')
+        return count_set_dialog
 
     def _copy_right_init(self):
         if self.copy_right is None:
@@ -233,25 +257,53 @@ class InitTAWidget(Ui_InitTAWidget, QMainWindow):
         self.showNormal()
         self.logger.debug('版权页关闭 ,显示主界面')
 
-    def _clock_widget_init(self):
-        self.clock_widget = ClockWidget()
-        self.clock_widget.label.setText('工作时间剩余:00:00:00')
+    def _build_clock_widget(self) -> ClockWidget:
+        clock_widget = ClockWidget()
+        clock_widget.label.setText('工作时间剩余:00:00:00')
+        clock_widget.is_relaxing = self.mode == RELAXING
+        clock_widget.setMouseTracking(self.mode == RELAXING)
+        clock_widget.subscribe(self.engine)
+        if self.engine.is_timing:
+            clock_widget.on_timing_tick(self.engine.remaining(), self.engine.mode)
+        clock_widget.visibility_changed_signal.connect(self.reschedule_tick)
         self.logger.debug('计时小控件初始化')
-
-    def _statistics_widget_init(self):
-        self.statistics_widget = StatisticsWidget()
+        return clock_widget
+
+    def _engine_init(self):
+        # 计时状态机，界面、小窗口和托盘分别订阅其事件
+        self.statistics = StatisticsEngine(self.db.fetch_all, self.db.execute)
+        self.session_store = SqlSessionStore(self.db, self.db_worker)
+        self.engine = TimerEngine(self.session_store)
+        self._planned_duration = 0  # 本次计时设定的秒数，写入结构化日志
+        self.engine.subscribe(EVENT_TICK, self.on_engine_tick)
+        self.engine.subscribe(EVENT_TERMINATE, self.on_engine_terminate)
+        self.ti.subscribe(self.engine)
+        self.journal_timer = QTimer(self)
+        self.journal_timer.timeout.connect(self.session_store.flush)
+        self.journal_timer.start(JOURNAL_FLUSH_INTERVAL * 1000)
+        self.logger.debug('计时引擎初始化')
+
+    def _build_statistics_widget(self) -> StatisticsWidget:
+        from BackEnd import analytics  # 导入NumPy较慢，推迟到第一次打开统计面板
+        if analytics.available():
+            self.session_analytics = analytics.SessionAnalytics()
+        statistics_widget = StatisticsWidget(self.statistics, self.session_analytics, self.db_worker)
         self.logger.debug('数据分析界面初始化')
+        return statistics_widget
 
     def _logger_init(self):
         # 初始化日志器参数
-        self.logger = LoggerHandler(
+        self.logger = get_logger(
             name=__name__
         )
         self.logger.set_file_handler(
             file=self.folder,
-            logger_level='INFO',
-            fmt='%(asctime)s %(levelname)s %(message)s'
+            logger_level=get_default_level(),  # 与--log-level和TIMEARRANGER_LOG_LEVEL一致
+            fmt='%(asctime)s %(levelname)s %(message)s',
+            use_queue=True,  # 文件写入在后台线程完成
+            structured=True  # JSON行格式，事件、任务和时长作为独立字段
         )
+        self.tick_telemetry = TickTelemetry(self.logger)
         self.logger.debug('Logger初始化')
 
     def _lcd_init(self):
@@ -260,18 +312,17 @@ class InitTAWidget(Ui_InitTAWidget, QMainWindow):
         self.logger.debug('LCD初始化')
 
     def _init_model_views(self):
-        self._open_DB()
-        self.model_task = QSqlQueryModel()
-        self.model_task.setQuery('SELECT task FROM ToDoList')
+        # 与计时设置面板共享同一个任务模型，只在启动时查询一次
+        self.model_task = TaskListModel(self.db, self.db_worker, self)
+        self.model_task.load()
         self.listView.setModel(self.model_task)
-        self.listView.setModelColumn(1)
-        self.listView.setCurrentIndex(self.listView.model().index(0, 0))
-        self.count_set_dialog.init_model_views()
+        self.listView.setCurrentIndex(self.model_task.index(0))
         self.logger.debug('ModelView加载')
-        self._close_DB()
 
     def _timer_init(self):
         self.timer = QTimer()
+        self.timer.setTimerType(Qt.PreciseTimer)  # 只负责刷新显示，剩余时间由引擎的单调时钟计算
+        self.timer.setSingleShot(True)  # 每次唤醒后按界面可见性重新安排下一次唤醒
         self.timer_copy_right = QTimer()
         self.timer.timeout.connect(self.timer_count_down)
         self.timer_copy_right.timeout.connect(self._copy_right_close)
@@ -284,9 +335,8 @@ class InitTAWidget(Ui_InitTAWidget, QMainWindow):
         return QPoint(int((screen.width() - size.width()) / 2), int((screen.height() - size.height()) / 2))
 
     def action_statistics_triggered(self):
-        if self.statistics_widget is None:
-            self.statistics_widget = StatisticsWidget()
-        self.statistics_widget.show()
+        # 先把日志中尚未写入的计时记录写入数据库，面板显示时才能统计到
+        self.session_store.flush(lambda _: self.statistics_widget.show())
         self.logger.debug('打开数据分析面板')
 
     def btn_start_timing_clicked(self):
@@ -311,27 +361,9 @@ class InitTAWidget(Ui_InitTAWidget, QMainWindow):
             msg.setInformativeText('再休息一下吧，恢复精力也是工作的一部分')
             msg.setStandardButtons(QMessageBox.Ok | QMessageBox.Cancel)
         ret = msg.exec()
-        # 工作模式，删除被中断的任务记录
-        if self.mode == WORKING:
-            self._open_DB()
-            query = QSqlQuery()
-            query.prepare('Delete From BasicUserData WHERE task = :task')
-            task = self.model_task.data(
-                self.listView.currentIndex()
-            )
-            if task is None:
-                if self.mode == WORKING:
-                    task = 'None'
-                else:
-                    task = 'Relaxing'
-            query.bindValue(':task', task)
-            if query.exec():
-                self.logger.debug('任务记录删除成功')
-            else:
-                self.logger.debug(query.lastError().text())
-
         if ret == QMessageBox.Ok:
-            self.is_timing = False
+            self._log_abandoned()
+            self.engine.stop()  # 由持久化层将本次计时记录标记为中断
             self.btn_stop_timing.setDisabled(True)
             self.btn_start_timing.setDisabled(False)
             if self.mode == WORKING:
@@ -340,210 +372,160 @@ class InitTAWidget(Ui_InitTAWidget, QMainWindow):
                 self.btn_rm_task.setDisabled(False)
             self.timer.stop()
             self.lcdNumber.display('00:00:00')
-            self.clock_widget.label.setText('工作时间剩余00:00:00')
-            self.clock_widget.close()
+
+    def _log_abandoned(self):
+        # 结构化日志中记录放弃的计时，duration为已经过的秒数
+        event = json_log.EVENT_TIMING_ABANDONED if self.mode == WORKING else json_log.EVENT_RELAX_ABANDONED
+        elapsed = max(0, self._planned_duration - self.engine.remaining())
+        self.logger.info('放弃计时', extra={'event': event, 'task': self.engine.task, 'duration': elapsed})
+
+    def _task_at(self, row):
+        return self.model_task.task_at(row)
+
+    def _task_id_at(self, row):
+        return self.model_task.task_id_at(row)
 
     def task_to_be_complete_selected_triggered(self, i):
-        self.listView.setCurrentIndex(self.listView.model().index(i, 0))
+        self.listView.setCurrentIndex(self.model_task.index(i))
         self.listView.setDisabled(True)
 
     def count_down_set_signal_triggered(self):
         # 从注册表加载计时时间
-        i = self.listView.currentIndex()
-        task = self.model_task.data(i)
+        row = self.listView.currentIndex().row()
+        task = self._task_at(row)
+        task_id = self._task_id_at(row) if self.mode == WORKING else None
         if task is None:
             if self.mode == WORKING:
                 task = 'None'
             else:
                 task = 'Relaxing'
-        self._open_DB()
-        query = QSqlQuery()
-        query.prepare(
-            '''
-            INSERT INTO BasicUserData (task, duration)
-            VALUES (:task, :duration) 
-            '''
-        )  # 执行完成本次插入后两个时间戳是相同的
+        self.btn_start_timing.setDisabled(True)
+        self.btn_stop_timing.setDisabled(False)
+        self.btn_rm_task.setDisabled(True)
+        self.btn_new_task.setDisabled(True)
+        duration = self.setting_manager.value('MainWindow/WorkingPeriod', 300)
+        duration = int(duration)  # 切记注册表存的是字符串，要转回原类型
+        self.lcdNumber.display(
+            format_time(duration)
+        )
+        self._planned_duration = duration
+        self.engine.start(duration, self.mode, task, task_id)
+        self._schedule_tick()
         if self.mode == WORKING:
-            self.is_timing = True
-            self.btn_start_timing.setDisabled(True)
-            self.btn_stop_timing.setDisabled(False)
-            self.btn_rm_task.setDisabled(True)
-            self.btn_new_task.setDisabled(True)
-            self.duration = self.setting_manager.value('MainWindow/WorkingPeriod', 300)
-            self.duration = int(self.duration)  # 切记注册表存的是字符串，要转回原类型
-            h, m, s = self._int2time(self.duration)
-            time_fmt = "%02d:%02d:%02d"%(h, m, s)
-            self.lcdNumber.display(
-                time_fmt
-            )
-            self.clock_widget.label.setText('工作时间剩余:' + time_fmt)
-            self.timer.start(1000)
-            self.logger.info('开始执行任务:%s' % task)
+            self.logger.info('开始执行任务:%s' % task, extra={
+                'event': json_log.EVENT_TIMING_START, 'task': task, 'duration': duration
+            })
         else:
-            self.is_timing = True
-            self.btn_start_timing.setDisabled(True)
-            self.btn_stop_timing.setDisabled(False)
-            self.btn_rm_task.setDisabled(True)
-            self.btn_new_task.setDisabled(True)
-            self.duration = self.setting_manager.value('MainWindow/WorkingPeriod', 300)
-            self.duration = int(self.duration)  # 切记注册表存的是字符串，要转回原类型
-            h, m, s = self._int2time(self.duration)
-            time_fmt = "%02d:%02d:%02d" % (h, m, s)
-            self.lcdNumber.display(
-                time_fmt
-            )
-            self.clock_widget.label.setText('休息时间剩余:' + time_fmt)
-            self.logger.info('开始休息')
-            self.timer.start(1000)
+            self.logger.info('开始休息', extra={'event': json_log.EVENT_RELAX_START, 'duration': duration})
             self.logger.debug('开始计时(休息时间)')
-
-        query.bindValue(':task', task)
-        query.bindValue(':duration', self.duration)
-        if query.exec():
-            self.logger.debug('BasicUserData插入已执行')
-        else:
-            self.logger.debug(query.lastError().text())
-        self._close_DB()
         self.close()
 
     def count_down_terminate_signal_triggered(self):
-        self._open_DB()
-        query = QSqlQuery()
-        query.prepare(
-            '''
-                UPDATE BasicUserData SET terminate_time = datetime('now') 
-                WHERE task = :task and (start_time in (SELECT max(start_time) FROM BasicUserData)) 
-            '''
-        )
-        i = self.listView.currentIndex()
-        task = self.model_task.data(i)
-        if task is None:
-            if self.mode == WORKING:
-                task = 'None'
-            else:
-                task = 'Relaxing'
-        query.bindValue(':task', task)
-        if query.exec():
-            self.logger.debug('BasicUserData修改值成功')
-        else:
-            self.logger.debug(query.lastError().text())
-
+        # BasicUserData的结束时间已由持久化层在引擎结束时更新
         self.logger.debug('计时结束')
         self.showNormal()
         # 提示框
         msg = QMessageBox(self)
         if self.mode == WORKING:
             msg.setText('计时结束')
-            i = self.listView.currentIndex()
-            selected_task = self.model_task.data(i)
+            selected_task = self._task_at(self.listView.currentIndex().row())
             msg.setInformativeText('任务%s已完成' % selected_task)
             msg.setStandardButtons(QMessageBox.Ok)
             msg.show()
-            self.btn_rm_task_clicked()  # 该函数里也打开了一次数据库，并执行了关闭，因此开发时遇到了bug
+            self._finish_selected_task()  # 完成的任务移出任务清单
             self.listView.setDisabled(False)
             self.btn_rm_task.setDisabled(False)
             self.btn_new_task.setDisabled(False)
-            self.logger.info('任务%s已完成' % selected_task)
+            self.logger.info('任务%s已完成' % selected_task, extra={
+                'event': json_log.EVENT_TIMING_FINISHED, 'task': selected_task, 'duration': self._planned_duration
+            })
         else:
             msg.setText('计时结束')
             msg.setInformativeText('休息结束了，恢复精力后继续认真完成工作吧')
             msg.setStandardButtons(QMessageBox.Ok)
             msg.show()
-            self.logger.info('休息结束')
+            self.logger.info('休息结束', extra={
+                'event': json_log.EVENT_RELAX_FINISHED, 'duration': self._planned_duration
+            })
 
         self.btn_start_timing.setDisabled(False)
         self.btn_stop_timing.setDisabled(True)
-        self.clock_widget.close()
         self.timer.stop()
-        self._close_DB()
-
-    def _int2time(self, time):
-        h = time / 60 / 60
-        m = time % 3600 / 60
-        s = time % 60
-        return int(h), int(m), int(s)
 
     def timer_count_down(self):
-        self.duration = self.duration - 1
-        h, m, s = self._int2time(self.duration)
-        time_fmt = "%02d:%02d:%02d" % (h, m, s)
-        self.lcdNumber.display(time_fmt)
-        if self.mode == WORKING:
-            self.clock_widget.label.setText('工作时间剩余:' + time_fmt)
-        else:
-            self.clock_widget.label.setText('休息时间剩余:' + time_fmt)
-        self.logger.debug('剩余时间%d', self.duration)
-        if self.duration == 0:
-            self.is_timing = False  # 更新标志，计时结束
-            self.count_down_terminate_signal.emit()
+        if self._tick_due is not None:
+            self.tick_telemetry.add(max(0.0, time.monotonic() - self._tick_due) * 1000)
+            self._tick_due = None
+        self.engine.tick()
+        self._schedule_tick()
+
+    def _is_count_down_visible(self) -> bool:
+        clock_widget = self.widgets.built('clock_widget')
+        return self.isVisible() or (clock_widget is not None and clock_widget.isVisible())
+
+    def _schedule_tick(self):
+        # 有界面显示时每个整秒边界唤醒一次，都不可见时直接睡到计时结束
+        delay = self.engine.next_wakeup_delay(self._is_count_down_visible())
+        if delay is None:
+            self.timer.stop()
+            self._tick_due = None
+            return
+        self._tick_due = time.monotonic() + delay
+        self.timer.start(math.ceil(delay * 1000))
+
+    def reschedule_tick(self):
+        # 界面显示状态变化，立即刷新一次显示并重新安排唤醒
+        if self.engine is None or not self.engine.is_timing:
+            return
+        self._tick_due = None  # 提前唤醒不计入tick延迟统计
+        self.timer_count_down()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.reschedule_tick()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.reschedule_tick()
+
+    def on_engine_tick(self, remaining, mode):
+        self.lcdNumber.display(format_time(remaining))
+
+    def on_engine_terminate(self, task, mode):
+        self.tick_telemetry.flush()
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('计时唤醒次数:%d, 漂移统计:%s', self.engine.tick_count, self.engine.drift.snapshot())
+        self.count_down_terminate_signal.emit()
 
     def btn_new_task_clicked(self):
         self.logger.debug('新建任务')
-        self._open_DB()
-        query = QSqlQuery()
-        query.prepare(
-            '''
-            INSERT INTO ToDoList (
-                is_finished,
-                task
-            ) 
-            VALUES (:is_finished, :task)
-            '''
-        )
         text, ok_pressed = QInputDialog.getText(self, '又有什么新的代办了吗', "任务名称", QLineEdit.Normal, "")
         if ok_pressed and text != '':
-            query.bindValue(":is_finished", 0)
-            query.bindValue(":task", text)
-            if query.exec() is True:
-                self.logger.debug('任务%s已创建', text)
-                self.logger.info('创建了新任务%s', text)
-            else:
-                self.logger.debug(query.lastError().text())
-        self._init_model_views()
-        self._close_DB()
+            row = self.model_task.add_task(text)
+            if not self.listView.currentIndex().isValid():
+                self.listView.setCurrentIndex(self.model_task.index(row))
+            self.logger.debug('任务%s已创建', text)
+            self.logger.info('创建了新任务%s', text, extra={'event': json_log.EVENT_TASK_CREATED, 'task': text})
 
     def btn_rm_task_clicked(self):
-        i = self.listView.currentIndex()
-        self._open_DB()
-        query = QSqlQuery()
-        query.prepare('''
-            DELETE FROM ToDoList WHERE id = :id
-        ''')
-        query.bindValue(':id', i.row()+1)
-        if query.exec() is True:
-            self.logger.debug('删除成功%d', i.row()+1)
-            i = self.listView.currentIndex()
-            task = self.model_task.data(i)
-            self.logger.info('将任务%s移出任务清单', task)
-            last_query = self.model_task.query().executedQuery()
-            self.model_task.setQuery(last_query)
-        else:
-            self.logger.debug('删除失败')
-
-        query = QSqlQuery()
-        query.prepare(
-            '''
-                UPDATE ToDoList SET id = id - 1 WHERE id > :id
-            ''')
-        query.bindValue(':id', i.row() + 1)
-        if query.exec() is True:
-            self.logger.debug('id更新完成')
-        else:
-            self.logger.debug('更新失败%s', query.lastError().text())
-
-        query = QSqlQuery()
-        query.prepare(
-            '''
-                UPDATE sqlite_sequence SET seq = seq - 1  WHERE name = "ToDoList"
-            '''
-        )
-        if query.exec() is True:
-            self.logger.debug('ToDoList_seq更新完成')
-        else:
-            self.logger.debug('更新失败%s', query.lastError().text())
-        self._init_model_views()
-        self._close_DB()
+        # 按模型中携带的稳定id移出清单，只移除视图中的这一行
+        row = self.listView.currentIndex().row()
+        task_id = self._task_id_at(row)
+        if task_id is None:
+            self.logger.debug('未选中任务')
+            return
+        task = self.model_task.remove_row(row)
+        self.logger.debug('移出成功%d', task_id)
+        self.logger.info('将任务%s移出任务清单', task, extra={'event': json_log.EVENT_TASK_REMOVED, 'task': task})
+
+    def _finish_selected_task(self):
+        # 标记为已完成并移出任务清单，计时记录仍关联该任务
+        row = self.listView.currentIndex().row()
+        task_id = self._task_id_at(row)
+        if task_id is None:
+            return
+        self.model_task.remove_row(row, TASK_FINISHED)
+        self.logger.debug('任务%d已标记完成', task_id)
 
     def btn_mode_clicked(self):
         if self.btn_mode.text() == '工作模式':
@@ -563,17 +545,21 @@ class InitTAWidget(Ui_InitTAWidget, QMainWindow):
 
     def switch_to_working(self):
         self.listView.setDisabled(False)
-        self.count_set_dialog.listView_task.setEnabled(True)
+        count_set_dialog = self.widgets.built('count_set_dialog')
+        if count_set_dialog is not None:
+            count_set_dialog.listView_task.setEnabled(True)
         self.btn_rm_task.setEnabled(True)
         self.btn_new_task.setEnabled(True)
-        self.clock_widget.setMouseTracking(False)
+        clock_widget = self.widgets.built('clock_widget')
+        if clock_widget is not None:
+            clock_widget.setMouseTracking(False)
         self.lcdNumber.setStyleSheet("border: 1px solid green; color: green; background: silver;")
 
     def switch_between_show_n_hide(self):
         #  用于主界面和计时小窗口显示状态切换
         if self.isVisible() is True:
             self.hide()
-            if self.is_timing is False:
+            if self.engine.is_timing is False:
                 return
             self.clock_widget.show()
         else:
@@ -583,34 +569,90 @@ class InitTAWidget(Ui_InitTAWidget, QMainWindow):
             # 窗口取消最小化并设置为活动状态
             self.setWindowState(self.windowState() & ~QtCore.Qt.WindowMinimized | QtCore.Qt.WindowActive)
             self.showNormal()
-            if self.is_timing is False:
+            if self.engine.is_timing is False:
                 return
             self.clock_widget.hide()
 
     def _init_listView_log(self):
-        self._init_log_list()  # 初始化日志列表
-        self._check_n_remove_log()  # 检查日志数量并且删除时间过早的日志
-        self.listWidget_log.setContextMenuPolicy(Qt.CustomContextMenu)
-        self.listWidget_log.customContextMenuRequested.connect(self._customize_context_menu) # 设置右键菜单栏，加载日志名称，绑定菜单栏触发事件
-        self._load_log_widget()  # 加载日志控件
+        self.log_list = []  # 后台扫描完成前右键菜单为空
+        self._replace_log_view()
+        self.listView_log.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.listView_log.customContextMenuRequested.connect(self._customize_context_menu) # 设置右键菜单栏，加载日志名称，绑定菜单栏触发事件
+        self._init_log_search()
+        self._init_log_list()  # 在后台扫描日志列表，完成后加载日志
+
+    def _replace_log_view(self):
+        # 界面文件中的QListWidget为每行日志创建一个控件，替换为搜索栏和由模型、委托绘制的QListView
+        self.model_log = LogListModel(self)
+        self._log_shown = None  # 按文件浏览时显示的日志
+        log_panel = QWidget(self.listWidget_log.parentWidget())
+        self.log_search_bar = LogSearchBar(self.model_task, log_panel)
+        self.listView_log = QListView(log_panel)
+        self.listView_log.setModel(self.model_log)
+        self.listView_log.setItemDelegate(LogItemDelegate(self.listView_log))
+        self.listView_log.setUniformItemSizes(True)
+        self.listView_log.setSelectionMode(QListView.SingleSelection)
+        self.log_tail = LogTail(self.model_log, self.listView_log, current_log_file, self)  # 显示当天日志时追加新写入的记录
+        panel_layout = QVBoxLayout(log_panel)
+        panel_layout.setContentsMargins(0, 0, 0, 0)
+        panel_layout.addWidget(self.log_search_bar)
+        panel_layout.addWidget(self.listView_log)
+        layout = self.listWidget_log.parentWidget().layout()
+        if layout is not None:
+            layout.replaceWidget(self.listWidget_log, log_panel)
+        else:
+            log_panel.setGeometry(self.listWidget_log.geometry())
+        self.listWidget_log.hide()
+        self.listWidget_log.deleteLater()
+        self.listWidget_log = None
+
+    def _init_log_search(self):
+        # 全文索引保存在独立的数据库中，启动时在后台线程补齐保留日志的索引，之后随日志写入增量更新
+        self.log_search = LogSearchIndex(self.folder)
+        if current_log_file() is not None:
+            add_file_companion(SearchIndexHandler(self.log_search, current_log_file))
+            add_archive_listener(self.log_search.replace_file)  # 轮换出的日志压缩后重新索引
+        self.log_search_bar.search_changed.connect(self.log_search_changed)
+
+    def log_search_changed(self, filters):
+        if not filters:  # 清空搜索条件后回到按文件浏览
+            if self._log_shown is not None:
+                self._refresh_list_view_log(self._log_shown)
+            else:
+                self.model_log.clear()
+            return
+        start = time.perf_counter()
+        if current_log_file() is not None:
+            # 补上增量更新间隔内写入的记录；后台线程正在建立索引时跳过，不阻塞界面
+            self.log_search.sync_file(current_log_file(), blocking=False)
+        results = self.log_search.search(**filters)
+        self.model_log.show_records((ts, level, message) for ts, level, message, _, _ in results)
+        self.logger.debug('日志搜索%d条, 耗时%.1fms', len(results), (time.perf_counter() - start) * 1000)
 
     def _init_log_list(self):
-        list_directory = os.listdir(self.folder)
-        self.log_list = []
-        for directory in list_directory:
-            de_path = self.folder + '//' + directory
-            if os.path.isfile(de_path):
-                if de_path.endswith('.log'):
-                    self.log_list.append(de_path)
-        self.log_list.sort(key=None, reverse=True)
+        # 日志目录同时存放数据库，文件较多或位于网络驱动器时扫描较慢，放到后台线程，不推迟首次绘制
+        self.log_list_loaded_signal.connect(self._log_list_loaded)
+        threading.Thread(target=self._scan_log_list, name='LogListScan', daemon=True).start()
+
+    def _scan_log_list(self):
+        # 后台线程: 等日志handler整理完旧日志后扫描目录，结果通过信号交给界面线程，随后补齐全文索引
+        start = time.perf_counter()
+        wait_log_maintenance(5)
+        try:
+            log_list = sort_logs(path for path, _, _ in scan_logs(self.folder))
+        except OSError:
+            self.logger.exception('扫描日志目录失败')
+            return
+        self.logger.debug('扫描日志目录%d个日志, 耗时%.1fms', len(log_list), (time.perf_counter() - start) * 1000)
+        self.log_list_loaded_signal.emit(log_list)
+        self.log_search.sync_all(log_list)
+
+    def _log_list_loaded(self, log_list):
+        # 包括当天的日志、分段和压缩的归档，按日期从新到旧排列
+        self.log_list = log_list
         self.logger.debug('加载日志列表')
-
-    def _check_n_remove_log(self):
-        # 删除过早的日志文件
-        if len(self.log_list) > 20:
-            for i in self.log_list[20:len(self.log_list)]:
-                self.log_list.remove(i)
-                os.remove(i)
+        if self._log_shown is None and not self.log_search_bar.filters():  # 扫描期间用户已选择日志或开始搜索时不覆盖
+            self._load_log_widget()  # 加载日志
 
     def _customize_context_menu(self, position):
         # 设置右键菜单栏，加载日志名称，绑定菜单栏触发事件
@@ -619,37 +661,24 @@ class InitTAWidget(Ui_InitTAWidget, QMainWindow):
             action = QAction(os.path.basename(log_path), self)
             action.triggered.connect(partial(self._refresh_list_view_log, log_path))
             pop_menu.addAction(action)
-        pop_menu.exec(self.listWidget_log.mapToGlobal(position))
+        pop_menu.exec(self.listView_log.mapToGlobal(position))
 
     def _refresh_list_view_log(self, log_path):
-        self.listWidget_log.clear()
-        path = log_path
-        with open(path) as f:
-            data_list = f.readlines()
-            if data_list:
-                for line in data_list:
-                    str_list = line.split(' ')
-                    w = LogWidget(str_list[0]+' '+str_list[1], str_list[3], str_list[2])
-                    item = QListWidgetItem()
-                    item.setSizeHint(QSize(200, 80))
-                    self.listWidget_log.addItem(item)
-                    self.listWidget_log.setItemWidget(item, w)
+        self._log_shown = log_path
+        self.model_log.load_file(log_path)
+        current = current_log_file()
+        if current is not None and os.path.abspath(log_path) == os.path.abspath(current):
+            self.log_tail.follow(log_path)
+        else:
+            self.log_tail.stop()
 
     def _load_log_widget(self):
-        # 加载日志控件, 默认加载列表第一位日志
-        with open(self.log_list[0]) as f:
-            data_list = f.readlines()
-            if data_list:
-                for line in data_list:
-                    str_list = line.split(' ')
-                    w = LogWidget(str_list[0] +' '+ str_list[1], str_list[3], str_list[2])
-                    item = QListWidgetItem()
-                    item.setSizeHint(QSize(200, 80))
-                    self.listWidget_log.addItem(item)
-                    self.listWidget_log.setItemWidget(item, w)
+        # 默认加载列表第一位日志
+        if self.log_list:
+            self._refresh_list_view_log(self.log_list[0])
 
     def quit(self):
-        if self.is_timing:  # 检测到还在计时，弹窗确认退出
+        if self.engine.is_timing:  # 检测到还在计时，弹窗确认退出
             msg = QMessageBox()
             if self.mode == WORKING:
                 msg.setText('还在计时中')
@@ -661,32 +690,18 @@ class InitTAWidget(Ui_InitTAWidget, QMainWindow):
                 msg.setStandardButtons(QMessageBox.Ok | QMessageBox.Cancel)
             ret = msg.exec()
             if ret == QMessageBox.Ok:
-                self.clock_widget.save_settings()
+                self._save_clock_widget_settings()
                 self._save_settings()
                 if self.mode == WORKING:
-                    i = self.listView.currentIndex()
-                    task = self.model_task.data(i)
-                    if task is None:
-                        if self.mode == WORKING:
-                            task = 'None'
-                        else:
-                            task = 'Relaxing'
-                    self.logger.info('在进行%s时中途放弃,要养成自律的好习惯!!!' % task)
-                    # 工作模式，删除被中断的任务记录
-                    self._open_DB()
-                    query = QSqlQuery()
-                    query.prepare('Delete From BasicUserData WHERE task = :task')
-                    query.bindValue(':task', task)
-                    if query.exec():
-                        self.logger.debug('任务记录删除成功')
-                    else:
-                        self.logger.debug(query.lastError().text())
+                    self.logger.info('在进行%s时中途放弃,要养成自律的好习惯!!!' % self.engine.task)
                 else:
-                    task = '休息'
-                    query = QSqlQuery()
-                    query.prepare('Delete From BasicUserData WHERE task = :task')
-                    query.bindValue(':task', task)
                     self.logger.info('工作很重要,但也要注意眼睛和身体!!!')
+                self._log_abandoned()
+                self.engine.stop()  # 由持久化层将本次计时记录标记为中断
+                self.model_task.flush()
+                self._close_DB()
+                self.logger.debug('日志队列状态:%s', self.logger.queue_stats())
+                stop_queue_listeners()
                 sys.exit(0)
         else:
             msg = QMessageBox()
@@ -695,13 +710,33 @@ class InitTAWidget(Ui_InitTAWidget, QMainWindow):
             msg.setStandardButtons(QMessageBox.Ok | QMessageBox.Cancel)
             ret = msg.exec()
             if ret == QMessageBox.Ok:
-                self.clock_widget.save_settings()
+                self._save_clock_widget_settings()
                 self._save_settings()
                 self.logger.info('TimeArranger正常退出')
+                self.model_task.flush()
+                self._close_DB()
+                self.logger.debug('日志队列状态:%s', self.logger.queue_stats())
+                stop_queue_listeners()
                 sys.exit(0)
 
+    def _close_DB(self):
+        # 先等待后台线程写完队列中的请求，再关闭界面线程的连接
+        self.journal_timer.stop()
+        self.session_store.close()
+        if self.session_analytics is not None:
+            self.db_worker.submit(self.session_analytics.close)  # sqlite3连接需在创建它的后台线程中关闭
+        self.db_worker.stop()
+        self.logger.info('数据库请求界面线程耗时:%s', self.db_worker.stats())
+        self.db.close()
+
+    def _save_clock_widget_settings(self):
+        # 计时小窗口从未显示过则没有需要保存的位置
+        clock_widget = self.widgets.built('clock_widget')
+        if clock_widget is not None:
+            clock_widget.save_settings()
+
     def closeEvent(self, event):
         event.ignore()
-        if self.is_timing is True:
+        if self.engine.is_timing is True:
             self.clock_widget.show()
         self.hide()
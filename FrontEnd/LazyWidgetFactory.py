@@ -0,0 +1,28 @@
+import time
+
+
+class LazyWidgetFactory:
+    # 次要窗口的延迟构造工厂，第一次使用时才构造并缓存
+
+    def __init__(self, logger):
+        self.logger = logger
+        self._builders = {}
+        self._widgets = {}
+        self.build_times = {}  # 各窗口的构造耗时(秒)
+
+    def register(self, name, builder):
+        self._builders[name] = builder
+
+    def get(self, name):
+        widget = self._widgets.get(name)
+        if widget is None:
+            start = time.perf_counter()
+            widget = self._builders[name]()
+            self.build_times[name] = time.perf_counter() - start
+            self._widgets[name] = widget
+            self.logger.debug('%s延迟构造完成, 耗时%.1fms', name, self.build_times[name] * 1000)
+        return widget
+
+    def built(self, name):
+        # 已构造则返回窗口，否则返回None，不触发构造
+        return self._widgets.get(name)
@@ -0,0 +1,57 @@
+from PyQt5.QtCore import Qt, QSize, QRect
+from PyQt5.QtGui import QColor, QFont
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle, QApplication, QStyleOptionViewItem
+
+from FrontEnd.LogListModel import LogTimeRole, LogLevelRole, LogMessageRole
+
+LEVEL_COLORS = {
+    'DEBUG': QColor('gray'),
+    'INFO': QColor('blue'),
+    'WARNING': QColor('darkorange'),
+    'ERROR': QColor('red'),
+    'CRITICAL': QColor('darkred'),
+}
+
+
+class LogItemDelegate(QStyledItemDelegate):
+    # 绘制一条日志: 第一行为时间和级别，第二行为消息，过长时省略
+    # 所有行高度相同，视图只需绘制可见的行
+    row_height = 48
+    margin = 6
+
+    def sizeHint(self, option, index):
+        return QSize(200, self.row_height)
+
+    def paint(self, painter, option, index):
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        opt.text = ''
+        style = opt.widget.style() if opt.widget is not None else QApplication.style()
+        style.drawControl(QStyle.CE_ItemViewItem, opt, painter, opt.widget)  # 背景和选中状态
+
+        rect = option.rect.adjusted(self.margin, self.margin // 2, -self.margin, -self.margin // 2)
+        half = rect.height() // 2
+        top = QRect(rect.left(), rect.top(), rect.width(), half)
+        bottom = QRect(rect.left(), rect.top() + half, rect.width(), rect.height() - half)
+        selected = bool(option.state & QStyle.State_Selected)
+        text_color = option.palette.highlightedText().color() if selected else option.palette.text().color()
+
+        painter.save()
+        font = QFont(option.font)
+        painter.setFont(font)
+        painter.setPen(text_color)
+        painter.drawText(top, Qt.AlignLeft | Qt.AlignVCenter, index.data(LogTimeRole) or '')
+
+        level = index.data(LogLevelRole) or ''
+        font.setBold(True)
+        painter.setFont(font)
+        painter.setPen(text_color if selected else LEVEL_COLORS.get(level, text_color))
+        painter.drawText(top, Qt.AlignRight | Qt.AlignVCenter, level)
+
+        font.setBold(False)
+        painter.setFont(font)
+        painter.setPen(text_color)
+        message = (index.data(LogMessageRole) or '').split('\n', 1)[0]  # 异常堆栈只显示第一行，完整内容见提示
+        message = option.fontMetrics.elidedText(message, Qt.ElideRight, bottom.width())
+        painter.drawText(bottom, Qt.AlignLeft | Qt.AlignVCenter, message)
+        painter.restore()
@@ -0,0 +1,141 @@
+import gzip
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt, QTimer, pyqtSignal
+
+from Log.log_index import LogIndex, decode_line, parse_log_line
+from Log.my_logger import get_logger
+
+LogTimeRole = Qt.UserRole + 1
+LogLevelRole = Qt.UserRole + 2
+LogMessageRole = Qt.UserRole + 3
+
+
+class LogListModel(QAbstractListModel):
+    # 日志查看器的数据模型，每行一条日志记录，由LogItemDelegate绘制，不再为每行创建控件
+    # 打开文件时只加载行偏移索引，行内容在滚动到可见时按块读取并解析
+    file_missing = pyqtSignal(str)  # 正在显示的文件被轮换、压缩或清理，重新加载后发出
+    block_size = 256  # 每次从文件读取的行数
+    cache_blocks = 16  # 最多缓存的已解析块数
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.path = None
+        self._index = None
+        self._rows = 0
+        self._blocks = {}  # 块号 -> 已解析的记录列表
+        self._records = None  # 显示搜索结果时为(时间, 级别, 消息)列表
+        self._reload_pending = False
+        self._logger_init()
+
+    def _logger_init(self):
+        self.logger = get_logger(
+            name=__name__
+        )
+        self.logger.debug('Logger初始化')
+
+    def load_file(self, path):
+        # 压缩的归档不能按偏移随机读取，解压后整体解析；归档大小受轮换的单文件上限约束
+        self.beginResetModel()
+        self.path = path
+        self._index = None
+        self._blocks = {}
+        self._records = None
+        self._rows = 0
+        try:
+            if path.endswith('.gz'):
+                with gzip.open(path, 'rb') as f:
+                    self._records = [parse_log_line(decode_line(line)) for line in f if line.strip()]
+                self._rows = len(self._records)
+            else:
+                self._index = LogIndex(path)
+                self._index.load()
+                self._rows = len(self._index)
+        except (OSError, EOFError) as e:  # 文件已被轮换、压缩或清理
+            self._index = None
+            self._records = []
+            self.logger.debug('日志%s无法读取: %s', path, e)
+        self.endResetModel()
+        self.logger.debug('加载日志%s, %d条', path, self._rows)
+
+    def append_new(self) -> int:
+        # 文件追加写入后只索引新增的行并通知视图插入，返回新增行数
+        if self._index is None:
+            return 0
+        try:
+            self._index.load(save_cache=False)
+        except OSError:
+            return 0
+        rows = len(self._index)
+        if rows < self._rows:  # 文件被截断或替换
+            self.load_file(self.path)
+            return self._rows
+        if rows == self._rows:
+            return 0
+        self._blocks.pop(self._rows // self.block_size, None)  # 最后一块之前可能不完整
+        first = self._rows
+        self.beginInsertRows(QModelIndex(), first, rows - 1)
+        self._rows = rows
+        self.endInsertRows()
+        return rows - first
+
+    def show_records(self, records):
+        # 显示搜索结果，不对应单个文件
+        self.beginResetModel()
+        self.path = None
+        self._index = None
+        self._blocks = {}
+        self._records = list(records)
+        self._rows = len(self._records)
+        self.endResetModel()
+
+    def clear(self):
+        self.show_records([])
+
+    def _record(self, row):
+        if self._records is not None:
+            return self._records[row]
+        block = row // self.block_size
+        records = self._blocks.get(block)
+        if records is None:
+            if len(self._blocks) >= self.cache_blocks:
+                self._blocks.pop(next(iter(self._blocks)))  # 丢弃最早读取的块
+            try:
+                lines = self._index.read_lines(block * self.block_size, self.block_size)
+            except OSError as e:
+                # 在data()中不能重置模型，也不能让异常抛出虚函数，先返回空行，回到事件循环后重新加载
+                if not self._reload_pending:
+                    self._reload_pending = True
+                    self.logger.debug('日志%s读取失败: %s', self.path, e)
+                    QTimer.singleShot(0, self._reload)
+                return '', '', ''
+            records = [parse_log_line(decode_line(line)) for line in lines]
+            self._blocks[block] = records
+        offset = row - block * self.block_size
+        if offset >= len(records):
+            return '', '', ''
+        return records[offset]
+
+    def _reload(self):
+        self._reload_pending = False
+        if self._index is None or self.path is None:  # 已切换到其他文件或搜索结果
+            return
+        path = self.path
+        self.load_file(path)
+        self.file_missing.emit(path)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._rows
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self._rows:
+            return None
+        if role not in (Qt.DisplayRole, Qt.ToolTipRole, LogMessageRole, LogTimeRole, LogLevelRole):
+            return None
+        log_time, log_level, log_msg = self._record(index.row())
+        if role == LogTimeRole:
+            return log_time
+        if role == LogLevelRole:
+            return log_level
+        return log_msg
@@ -0,0 +1,95 @@
+import datetime
+
+from PyQt5.QtCore import QDate, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QWidget, QHBoxLayout, QLineEdit, QComboBox, QCheckBox, QDateEdit, QCompleter
+
+from Log.log_index import LEVEL_NAMES
+from Log.my_logger import get_logger
+
+
+class LogSearchBar(QWidget):
+    # 日志面板上方的搜索栏，条件变化后稍作延迟再发出搜索信号，连续输入时只搜索一次
+    # search_changed携带LogSearchIndex.search的关键字参数，所有条件为空时为空字典，表示回到按文件浏览
+    search_changed = pyqtSignal(dict)
+    delay_ms = 250
+
+    def __init__(self, task_model=None, parent=None):
+        super().__init__(parent)
+        self._logger_init()
+        self._init_ui(task_model)
+
+    def _logger_init(self):
+        self.logger = get_logger(
+            name=__name__
+        )
+        self.logger.debug('Logger初始化')
+
+    def _init_ui(self, task_model):
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.lineEdit_text = QLineEdit()
+        self.lineEdit_text.setPlaceholderText('搜索日志')
+        self.lineEdit_text.setClearButtonEnabled(True)
+        self.comboBox_level = QComboBox()
+        self.comboBox_level.addItem('全部级别', None)
+        for level in LEVEL_NAMES:
+            self.comboBox_level.addItem(level, level)
+        self.checkBox_date = QCheckBox('日期')
+        today = QDate.currentDate()
+        self.dateEdit_since = QDateEdit(today.addDays(-6))
+        self.dateEdit_until = QDateEdit(today)
+        for date_edit in (self.dateEdit_since, self.dateEdit_until):
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat('yyyy-MM-dd')
+            date_edit.setEnabled(False)
+        self.lineEdit_task = QLineEdit()
+        self.lineEdit_task.setPlaceholderText('任务')
+        self.lineEdit_task.setClearButtonEnabled(True)
+        if task_model is not None:  # 按已有任务名补全
+            self.lineEdit_task.setCompleter(QCompleter(task_model, self.lineEdit_task))
+        layout.addWidget(self.lineEdit_text, 3)
+        layout.addWidget(self.comboBox_level)
+        layout.addWidget(self.checkBox_date)
+        layout.addWidget(self.dateEdit_since)
+        layout.addWidget(self.dateEdit_until)
+        layout.addWidget(self.lineEdit_task, 1)
+
+        self._delay_timer = QTimer(self)
+        self._delay_timer.setSingleShot(True)
+        self._delay_timer.timeout.connect(self._emit_search)
+        self.lineEdit_text.textChanged.connect(self._schedule_search)
+        self.lineEdit_task.textChanged.connect(self._schedule_search)
+        self.comboBox_level.currentIndexChanged.connect(self._schedule_search)
+        self.checkBox_date.toggled.connect(self.dateEdit_since.setEnabled)
+        self.checkBox_date.toggled.connect(self.dateEdit_until.setEnabled)
+        self.checkBox_date.toggled.connect(self._schedule_search)
+        self.dateEdit_since.dateChanged.connect(self._schedule_search)
+        self.dateEdit_until.dateChanged.connect(self._schedule_search)
+
+    def _schedule_search(self, *args):
+        self._delay_timer.start(self.delay_ms)
+
+    def filters(self) -> dict:
+        filters = {}
+        text = self.lineEdit_text.text().strip()
+        if text:
+            filters['text'] = text
+        level = self.comboBox_level.currentData()
+        if level:
+            filters['level'] = level
+        if self.checkBox_date.isChecked():
+            filters['since'] = self._to_date(self.dateEdit_since.date())
+            filters['until'] = self._to_date(self.dateEdit_until.date())
+        task = self.lineEdit_task.text().strip()
+        if task:
+            filters['task'] = task
+        return filters
+
+    @staticmethod
+    def _to_date(qdate) -> datetime.date:
+        return datetime.date(qdate.year(), qdate.month(), qdate.day())
+
+    def _emit_search(self):
+        filters = self.filters()
+        self.logger.debug('日志搜索条件:%s', filters)
+        self.search_changed.emit(filters)
@@ -0,0 +1,86 @@
+import os
+
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer
+
+from Log.my_logger import get_logger
+
+
+class LogTail(QObject):
+    # 跟踪正在写入的日志文件，只把新增的记录追加到模型
+    # 文件变化通知先合并，距上次刷新至少interval_ms才刷新一次；部分平台上写入中的文件不一定触发通知，另以较低频率轮询
+    interval_ms = 500
+    poll_ms = 3000
+
+    def __init__(self, model, view=None, current_file=None, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.view = view
+        self.current_file = current_file  # 返回当前日志文件路径的函数，日志轮换后切换到新文件
+        self.path = None
+        self.refresh_count = 0
+        self.appended = 0
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._file_changed)
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.timeout.connect(self.refresh)
+        self._poll_timer = QTimer(self)
+        self._poll_timer.timeout.connect(self._file_changed)
+        self.model.file_missing.connect(self._file_changed)  # 显示中的文件被轮换，尽快切换到新文件
+        self._logger_init()
+
+    def _logger_init(self):
+        self.logger = get_logger(
+            name=__name__
+        )
+        self.logger.debug('Logger初始化')
+
+    def follow(self, path):
+        # path为None时停止跟踪
+        if self._watcher.files():
+            self._watcher.removePaths(self._watcher.files())
+        self._refresh_timer.stop()
+        self._poll_timer.stop()
+        self.path = path
+        if path is None:
+            return
+        self._watcher.addPath(path)
+        self._poll_timer.start(self.poll_ms)
+
+    def stop(self):
+        self.follow(None)
+
+    def _file_changed(self, *args):
+        if self.path is None:
+            return
+        if self.path not in self._watcher.files() and os.path.exists(self.path):
+            self._watcher.addPath(self.path)  # 文件被替换后监视会失效
+        if not self._refresh_timer.isActive():
+            self._refresh_timer.start(self.interval_ms)
+
+    def _at_bottom(self) -> bool:
+        if self.view is None:
+            return False
+        scroll_bar = self.view.verticalScrollBar()
+        return scroll_bar.value() >= scroll_bar.maximum()
+
+    def refresh(self):
+        # 只在模型仍显示被跟踪的文件时追加，显示搜索结果或其他文件时忽略
+        if self.path is None or self.model.path != self.path:
+            return
+        if self.current_file is not None:
+            current = self.current_file()
+            if current is not None and os.path.abspath(current) != os.path.abspath(self.path):
+                self.logger.debug('日志已轮换到%s', current)
+                self.model.load_file(current)
+                self.follow(current)
+                if self.view is not None:
+                    self.view.scrollToBottom()
+                return
+        follow_bottom = self._at_bottom()
+        count = self.model.append_new()
+        self.refresh_count += 1
+        if count:
+            self.appended += count
+            if follow_bottom:
+                self.view.scrollToBottom()
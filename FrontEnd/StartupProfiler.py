@@ -0,0 +1,53 @@
+import json
+import time
+
+from PyQt5.QtCore import QObject, QEvent, QTimer
+from PyQt5.QtWidgets import QApplication
+
+
+class StartupProfiler(QObject):
+    # 记录启动各阶段相对进程起点的时间，直到主界面第一次绘制，结果写入JSON报告
+
+    def __init__(self, origin, report_path, exit_after_paint=False):
+        super().__init__()
+        self.origin = origin
+        self.report_path = report_path
+        self.exit_after_paint = exit_after_paint
+        self.marks = []  # (阶段, 距起点秒数)
+        self.phases = []  # 主界面各_init_步骤的耗时(秒)
+        self.main_window = None
+        self._first_paint = False
+
+    def mark(self, name, at=None):
+        if at is None:
+            at = time.perf_counter()
+        self.marks.append((name, at - self.origin))
+
+    def watch(self, main_window):
+        # 监听全局绘制事件，分别记录第一次绘制(版权页)和主界面第一次绘制
+        self.main_window = main_window
+        self.phases = list(main_window.startup_phases)
+        QApplication.instance().installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            if not self._first_paint:
+                self._first_paint = True
+                self.mark('first_paint')
+            if obj is self.main_window:
+                self.mark('main_window_first_paint')
+                QApplication.instance().removeEventFilter(self)
+                self.write()
+                if self.exit_after_paint:
+                    QTimer.singleShot(0, QApplication.instance().quit)
+        return False
+
+    def report(self) -> dict:
+        return {
+            'marks_ms': {name: at * 1000 for name, at in self.marks},
+            'init_phases_ms': {name: elapsed * 1000 for name, elapsed in self.phases},
+        }
+
+    def write(self):
+        with open(self.report_path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
@@ -1,12 +1,117 @@
 from UI.UI_StatisticsWidget import Ui_StatisticsWidget
-from PyQt5.QtWidgets import QWidget
+from BackEnd.timer_engine import format_time
+from Log.my_logger import get_logger
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem, QHeaderView
 
 
 class StatisticsWidget(Ui_StatisticsWidget, QWidget):
-    def __init__(self):
+    days_shown = 14  # 每日统计显示的天数
+
+    def __init__(self, statistics, session_analytics=None, worker=None):
         super().__init__()
+        self.statistics = statistics  # BackEnd.statistics.StatisticsEngine
+        self.session_analytics = session_analytics  # BackEnd.analytics.SessionAnalytics，需要NumPy，未安装时为None
+        self.worker = worker  # BackEnd.db_worker.DBWorker，分析在后台线程中执行
+        self._summary = ''
         self.setupUi(self)
+        self._logger_init()
         self._init_ui()
 
+    def _logger_init(self):
+        self.logger = get_logger(
+            name=__name__
+        )
+        self.logger.debug('Logger初始化')
+
     def _init_ui(self):
-        pass
\ No newline at end of file
+        # 统计控件在代码中创建，追加到界面文件生成的布局中
+        layout = self.layout()
+        if layout is None:
+            layout = QVBoxLayout(self)
+        self.label_summary = QLabel()
+        self.table_daily = self._new_table(['日期', '专注', '休息', '完成', '中断'])
+        self.table_task = self._new_table(['任务', '专注', '完成', '中断'])
+        layout.addWidget(self.label_summary)
+        layout.addWidget(self.table_daily)
+        layout.addWidget(self.table_task)
+        self.table_heatmap = None
+        self.table_duration = None
+        self.table_task_history = None
+        if self.session_analytics is not None and self.worker is not None:
+            # 专注时间分布热力图: 行为星期，列为小时，单位分钟
+            self.table_heatmap = self._new_table(['%d' % h for h in range(24)])
+            self.table_heatmap.setRowCount(7)
+            self.table_heatmap.verticalHeader().setVisible(True)
+            self.table_heatmap.setVerticalHeaderLabels(['一', '二', '三', '四', '五', '六', '日'])
+            # 专注时长分布与按任务id汇总的全部历史(包括已完成的任务)
+            self.table_duration = self._new_table(['时长', '次数'])
+            self.table_task_history = self._new_table(['任务', '累计专注'])
+            layout.addWidget(self.table_heatmap)
+            layout.addWidget(self.table_duration)
+            layout.addWidget(self.table_task_history)
+
+    def _new_table(self, headers) -> QTableWidget:
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        table.verticalHeader().setVisible(False)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        return table
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def refresh(self):
+        # 只读取汇总表中显示范围内的行
+        daily = self.statistics.daily(self.days_shown)
+        weekly = self.statistics.weekly(1)
+        rate = self.statistics.completion_rate(self.days_shown)
+        streak = self.statistics.streak()
+        this_week = weekly[-1] if weekly else (None, 0, 0, 0, 0)
+        self._summary = '本周专注%s, 休息%s, 近%d天完成率%s, 连续专注%d天' % (
+            format_time(this_week[1]),
+            format_time(this_week[2]),
+            self.days_shown,
+            '--' if rate is None else '%.0f%%' % (rate * 100),
+            streak,
+        )
+        self.label_summary.setText(self._summary)
+        self._fill_table(self.table_daily, [
+            (day, format_time(focus), format_time(relax), finished, interrupted)
+            for day, focus, relax, finished, interrupted in reversed(daily)
+        ])
+        self._fill_table(self.table_task, [
+            (task, format_time(focus), finished, interrupted)
+            for task, focus, finished, interrupted, _ in self.statistics.per_task()
+        ])
+        if self.table_heatmap is not None:
+            # 读取和计算在后台线程中进行，结果经后台线程的信号回到界面线程
+            self.worker.submit(self.session_analytics.snapshot, self._analytics_loaded)
+        self.logger.debug('数据分析面板刷新')
+
+    def _analytics_loaded(self, result):
+        if isinstance(result, Exception):
+            self.logger.debug('数据分析失败:%s', result)
+            return
+        heatmap = result['heatmap']
+        for weekday in range(7):
+            for hour in range(24):
+                self.table_heatmap.setItem(weekday, hour, QTableWidgetItem(str(heatmap[weekday, hour] // 60)))
+        self._fill_table(self.table_duration, [
+            ('%s - %s' % (format_time(low), format_time(high)), count)
+            for low, high, count in result['histogram']
+        ])
+        self._fill_table(self.table_task_history, [
+            (task, format_time(seconds)) for task, seconds in result['per_task']
+        ])
+        rolling = result['rolling_average']
+        if len(rolling):
+            self.label_summary.setText(self._summary + ', 7日平均专注%s' % format_time(int(rolling[-1])))
+        self.logger.debug('数据分析完成, 共%d次计时', result['sessions'])
+
+    def _fill_table(self, table, rows):
+        table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            for c, value in enumerate(row):
+                table.setItem(r, c, QTableWidgetItem(str(value)))
@@ -0,0 +1,136 @@
+from functools import partial
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt, QTimer
+
+from BackEnd.schema import TASK_OPEN, TASK_REMOVED
+from Log.my_logger import get_logger
+
+TaskIdRole = Qt.UserRole + 1
+
+
+class TaskListModel(QAbstractListModel):
+    # 主界面和计时设置面板共享的任务列表模型
+    # 只在启动时整表查询一次，增删任务直接修改内存中的列表并通知视图，数据库写入延后到事件循环空闲时交给后台线程批量执行
+
+    def __init__(self, db, worker=None, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.worker = worker
+        self._ids = []
+        self._tasks = []
+        self._next_id = 1
+        self._next_sort_key = 1
+        self._pending = []  # 待写入数据库的(sql, 绑定参数)
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.timeout.connect(self.flush)
+        self._logger_init()
+
+    def _logger_init(self):
+        self.logger = get_logger(
+            name=__name__
+        )
+        self.logger.debug('Logger初始化')
+
+    def load(self):
+        self.beginResetModel()
+        self._ids = []
+        self._tasks = []
+        query = self.db.query()
+        query.exec('SELECT id, task, sort_key FROM ToDoList WHERE is_finished = %d ORDER BY sort_key' % TASK_OPEN)
+        max_sort_key = 0
+        while query.next():
+            self._ids.append(query.value(0))
+            self._tasks.append(query.value(1))
+            if query.value(2) is not None:
+                max_sort_key = max(max_sort_key, query.value(2))
+        self.endResetModel()
+        # 新任务的id在本地分配，需跳过已移出清单的任务用过的AUTOINCREMENT序号
+        query = self.db.query()
+        query.exec("SELECT seq FROM sqlite_sequence WHERE name = 'ToDoList'")
+        seq = query.value(0) if query.next() else 0
+        self._next_id = max([seq or 0] + self._ids) + 1
+        self._next_sort_key = max_sort_key + 1
+        self.logger.debug('任务列表加载%d项', len(self._ids))
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._ids)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._ids):
+            return None
+        if role == Qt.DisplayRole:
+            return self._tasks[index.row()]
+        if role == TaskIdRole:
+            return self._ids[index.row()]
+        return None
+
+    def task_at(self, row):
+        if 0 <= row < len(self._tasks):
+            return self._tasks[row]
+        return None
+
+    def task_id_at(self, row):
+        if 0 <= row < len(self._ids):
+            return self._ids[row]
+        return None
+
+    def add_task(self, task) -> int:
+        task_id = self._next_id
+        sort_key = self._next_sort_key
+        self._next_id += 1
+        self._next_sort_key += 1
+        row = len(self._ids)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._ids.append(task_id)
+        self._tasks.append(task)
+        self.endInsertRows()
+        self._queue_write(
+            'INSERT INTO ToDoList (id, is_finished, task, sort_key) VALUES (:id, 0, :task, :sort_key)',
+            {':id': task_id, ':task': task, ':sort_key': sort_key}
+        )
+        return row
+
+    def remove_row(self, row, state=TASK_REMOVED):
+        # 只标记任务状态，保留ToDoList中的行，计时记录通过task_id关联的任务不会丢失
+        task_id = self.task_id_at(row)
+        if task_id is None:
+            return None
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._ids[row]
+        task = self._tasks.pop(row)
+        self.endRemoveRows()
+        self._queue_write('UPDATE ToDoList SET is_finished = :state WHERE id = :id', {':id': task_id, ':state': state})
+        return task
+
+    def _queue_write(self, sql, binds):
+        self._pending.append((sql, binds))
+        if not self._flush_timer.isActive():
+            self._flush_timer.start(0)
+
+    def flush(self):
+        # 将积压的写入放在一个事务中执行，退出前也需调用一次
+        self._flush_timer.stop()
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        if self.worker is None:
+            self._write(pending, self.db)
+        else:
+            self.worker.submit(partial(self._write, pending))
+
+    def _write(self, pending, db):
+        # 有后台线程时在后台线程中执行，db为后台连接
+        conn = db.connection()
+        conn.transaction()
+        for sql, binds in pending:
+            query = db.query()
+            query.prepare(sql)
+            for key, value in binds.items():
+                query.bindValue(key, value)
+            if query.exec() is False:
+                self.logger.debug('任务写入失败%s', query.lastError().text())
+        conn.commit()
+        self.logger.debug('任务列表写入%d条', len(pending))
@@ -0,0 +1,44 @@
+import json
+import logging
+
+# 结构化日志每行一个JSON对象，字段固定: 时间、级别、事件、任务、时长(秒)、消息
+# event/task/duration通过logger.info(msg, extra={'event': ..., 'task': ..., 'duration': ...})传入，没有时为null
+STRUCTURED_FIELDS = ('ts', 'level', 'event', 'task', 'duration', 'msg')
+
+# 计时相关的事件名
+EVENT_TIMING_START = 'timing_start'
+EVENT_TIMING_FINISHED = 'timing_finished'
+EVENT_TIMING_ABANDONED = 'timing_abandoned'
+EVENT_RELAX_START = 'relax_start'
+EVENT_RELAX_FINISHED = 'relax_finished'
+EVENT_RELAX_ABANDONED = 'relax_abandoned'
+EVENT_TASK_CREATED = 'task_created'
+EVENT_TASK_REMOVED = 'task_removed'
+
+
+class JsonLinesFormatter(logging.Formatter):
+    # 时间格式与文本日志相同，按日期过滤和排序时两种格式可以混用
+
+    def format(self, record):
+        record.message = record.getMessage()
+        line = {
+            'ts': self.formatTime(record, self.datefmt),
+            'level': record.levelname,
+            'event': getattr(record, 'event', None),
+            'task': getattr(record, 'task', None),
+            'duration': getattr(record, 'duration', None),
+            'msg': record.message,
+        }
+        if record.exc_info:
+            line['exc'] = self.formatException(record.exc_info)
+        return json.dumps(line, ensure_ascii=False)
+
+
+def loads_record(raw):
+    # raw为一行的bytes或str，不是结构化日志时返回None
+    if raw[:1] not in (b'{', '{'):
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
@@ -0,0 +1,146 @@
+import json
+import locale
+import mmap
+import os
+import struct
+from array import array
+from itertools import accumulate, islice
+
+# 索引文件保存在日志旁边: 头部为(魔数, 版本, 日志大小, 日志修改时间)，之后为每行起始字节偏移
+INDEX_SUFFIX = '.idx'
+_HEADER = struct.Struct('<4sIQQ')
+_MAGIC = b'TAIX'
+_VERSION = 1
+_CHUNK = 4 * 1024 * 1024
+LEVEL_NAMES = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+
+def decode_line(raw: bytes) -> str:
+    # 日志文件按系统默认编码写入，优先按UTF-8解码
+    raw = raw.rstrip(b'\r\n')
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return raw.decode(locale.getpreferredencoding(False), errors='replace')
+
+
+def parse_log_line(line):
+    # 日志格式为 '%(asctime)s %(levelname)s %(message)s'，返回(时间, 级别, 消息)，消息中可以包含空格
+    # 异常堆栈等续行没有时间和级别，整行作为消息；结构化日志(JSON行)直接取对应字段
+    if line.startswith('{'):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if isinstance(record, dict):
+            return record.get('ts') or '', record.get('level') or '', record.get('msg') or ''
+    parts = line.rstrip('\r\n').split(' ', 3)
+    if len(parts) < 4 or parts[2] not in LEVEL_NAMES:
+        return '', '', line.rstrip('\r\n')
+    return parts[0] + ' ' + parts[1], parts[2], parts[3]
+
+
+class LogIndex:
+    # 日志文件的行偏移索引，只索引以换行结尾的完整行，打开大文件时不读取行内容
+    # 日志只会在末尾追加，文件变大时从上次索引到的位置继续扫描
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        self.offsets = array('Q', [0])  # 第i行为[offsets[i], offsets[i + 1])
+        self.size = 0  # 建立索引时的文件大小
+        self.mtime = 0
+        self._loaded = False
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def indexed_size(self) -> int:
+        return self.offsets[-1]
+
+    def load(self, save_cache=True):
+        # 读取缓存的索引，与文件不一致时重新扫描或继续扫描，返回新增的行数
+        # 跟踪写入中的文件时频繁调用，可不写缓存，下次打开从缓存的位置继续扫描即可
+        st = os.stat(self.path)
+        if not self._loaded:
+            self._loaded = True
+            if not self._read_cache(st):
+                self.offsets = array('Q', [0])
+        if (st.st_size, st.st_mtime_ns) == (self.size, self.mtime):
+            return 0
+        if st.st_size < self.indexed_size:  # 文件被截断或替换
+            self.offsets = array('Q', [0])
+        before = len(self)
+        self._scan(st.st_size)
+        self.size, self.mtime = st.st_size, st.st_mtime_ns
+        if save_cache:
+            self._write_cache()
+        return len(self) - before
+
+    def _read_cache(self, st) -> bool:
+        try:
+            with open(self.index_path, 'rb') as f:
+                magic, version, size, mtime = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != _MAGIC or version != _VERSION or size > st.st_size:
+                    return False
+                offsets = array('Q')
+                offsets.frombytes(f.read())
+        except (OSError, struct.error, ValueError):
+            return False
+        if not offsets or offsets[-1] > size:
+            return False
+        self.offsets = offsets
+        self.size, self.mtime = size, mtime
+        return True
+
+    def _write_cache(self):
+        try:
+            with open(self.index_path, 'wb') as f:
+                f.write(_HEADER.pack(_MAGIC, _VERSION, self.size, self.mtime))
+                self.offsets.tofile(f)
+        except OSError:
+            pass  # 索引只是缓存，写不了就下次重新扫描
+
+    def _scan(self, size):
+        start = self.indexed_size
+        if size <= start:
+            return
+        with open(self.path, 'rb') as f:
+            with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+                pos = start
+                while pos < size:
+                    chunk = mm[pos:min(pos + _CHUNK, size)]
+                    last = chunk.rfind(b'\n')
+                    if last < 0:
+                        if pos + len(chunk) >= size:
+                            break  # 末尾未写完的行，等下次追加后再索引
+                        # 超长的行，扩大读取范围
+                        end = mm.find(b'\n', pos + len(chunk))
+                        if end < 0:
+                            break
+                        self.offsets.append(end + 1)
+                        pos = end + 1
+                        continue
+                    # 每行长度+1即为下一行的起始偏移，split和accumulate都在C中完成
+                    lengths = map((1).__add__, map(len, chunk[:last].split(b'\n')))
+                    self.offsets.extend(islice(accumulate(lengths, initial=pos), 1, None))
+                    pos += last + 1
+
+    def read_lines(self, first, count) -> list:
+        # 读取[first, first + count)行的原始字节，一次打开文件，不常驻文件句柄
+        last = min(first + count, len(self))
+        if first >= last:
+            return []
+        begin = self.offsets[first]
+        with open(self.path, 'rb') as f:
+            f.seek(begin)
+            data = f.read(self.offsets[last] - begin)
+        return [data[self.offsets[i] - begin:self.offsets[i + 1] - begin] for i in range(first, last)]
+
+    @staticmethod
+    def remove_cache(path):
+        try:
+            os.remove(path + INDEX_SUFFIX)
+        except FileNotFoundError:
+            pass
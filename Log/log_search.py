@@ -0,0 +1,263 @@
+import os
+import gzip
+import time
+import logging
+import sqlite3
+import datetime
+import threading
+
+from Log.json_log import loads_record
+from Log.log_index import decode_line, parse_log_line
+
+SEARCH_DB_FILE_NAME = 'log_search.sqlite'
+_CHUNK = 256 * 1024  # 每个事务写入的字节数，查询最多等待一个事务；查询前的增量同步不等待其他线程读取日志(见sync_file)
+_MIN_MATCH_LEN = 3  # trigram分词只能匹配3个字符以上的词，更短的词逐行比较
+
+SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS files
+    (
+        id INTEGER PRIMARY KEY,
+        path TEXT NOT NULL UNIQUE,
+        indexed_bytes INTEGER NOT NULL DEFAULT 0,
+        lines INTEGER NOT NULL DEFAULT 0,
+        last_ts TEXT,
+        last_level TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS records
+    (
+        id INTEGER PRIMARY KEY,
+        file_id INTEGER NOT NULL,
+        line INTEGER NOT NULL,
+        ts TEXT,
+        level TEXT,
+        task TEXT,
+        message TEXT NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_records_file ON records (file_id)',
+    'CREATE INDEX IF NOT EXISTS idx_records_ts ON records (ts)',
+    'CREATE INDEX IF NOT EXISTS idx_records_level_ts ON records (level, ts)',
+)
+
+# 外部内容全文索引，由触发器与records同步
+FTS_SCHEMA = (
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS records_fts
+    USING fts5(message, content='records', content_rowid='id', tokenize='trigram')
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS records_ai AFTER INSERT ON records BEGIN
+        INSERT INTO records_fts (rowid, message) VALUES (new.id, new.message);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS records_ad AFTER DELETE ON records BEGIN
+        INSERT INTO records_fts (records_fts, rowid, message) VALUES ('delete', old.id, old.message);
+    END
+    ''',
+)
+
+
+class LogSearchIndex:
+    # 所有保留日志的全文索引，使用独立的sqlite3数据库，不占用界面的数据库连接
+    # 每个日志文件记录已索引到的字节位置，文件增长后只读取新增部分，同一行不会重复索引
+    # 界面线程查询、后台线程建立索引和日志线程增量更新共用一个连接
+    # _lock保护连接，每个事务单独加锁；_sync_lock保证同一时刻只有一个线程在读取日志文件
+
+    def __init__(self, folder):
+        self.path = folder + '//' + SEARCH_DB_FILE_NAME
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        with self.conn:
+            for sql in SCHEMA:
+                self.conn.execute(sql)
+        self.fts = self._init_fts()
+
+    def _init_fts(self) -> bool:
+        # 缺少FTS5或trigram分词(SQLite 3.34之前)时退化为逐行比较
+        try:
+            with self.conn:
+                for sql in FTS_SCHEMA:
+                    self.conn.execute(sql)
+        except sqlite3.OperationalError:
+            return False
+        return True
+
+    def sync_all(self, paths):
+        # 索引paths中的新增内容，并删除已不在保留列表中的文件的记录，返回新增记录数
+        paths = set(os.path.abspath(path) for path in paths)
+        added = 0
+        with self._sync_lock:
+            with self._lock:
+                for file_id, path in self.conn.execute('SELECT id, path FROM files').fetchall():
+                    if path not in paths:
+                        self._drop_file(file_id)
+            for path in sorted(paths):
+                added += self._sync_file(path)
+        return added
+
+    def replace_file(self, source, archive=None):
+        # 日志被压缩或删除后调用: 删除原路径的记录并索引归档，搜索结果不会丢失或重复
+        source = os.path.abspath(source)
+        with self._sync_lock:
+            with self._lock:
+                row = self.conn.execute('SELECT id FROM files WHERE path = ?', (source,)).fetchone()
+                if row is not None:
+                    self._drop_file(row[0])
+            if archive is not None:
+                return self._sync_file(archive)
+        return 0
+
+    def _drop_file(self, file_id):
+        with self.conn:
+            self.conn.execute('DELETE FROM records WHERE file_id = ?', (file_id,))
+            self.conn.execute('DELETE FROM files WHERE id = ?', (file_id,))
+
+    def sync_file(self, path, blocking=True) -> int:
+        # blocking为False时若其他线程正在读取日志(如启动时的sync_all)则跳过本次同步返回0，界面线程不会等待整个文件建完索引
+        if not self._sync_lock.acquire(blocking):
+            return 0
+        try:
+            return self._sync_file(path)
+        finally:
+            self._sync_lock.release()
+
+    def _sync_file(self, path) -> int:
+        # .gz归档整个文件只索引一次，indexed_bytes记为压缩后的大小；索引中途退出时记为-1，下次重新索引
+        path = os.path.abspath(path)
+        archive = path.endswith('.gz')
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return 0
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT id, indexed_bytes, lines, last_ts, last_level FROM files WHERE path = ?', (path,)
+            ).fetchone()
+            if row is not None and (size < row[1] or (archive and size != row[1])):  # 文件被截断或替换，重新索引
+                self._drop_file(row[0])
+                row = None
+            if row is None:
+                with self.conn:
+                    file_id = self.conn.execute('INSERT INTO files (path) VALUES (?)', (path,)).lastrowid
+                row = (file_id, 0, 0, None, None)
+        file_id, offset, line_no, last_ts, last_level = row
+        added = 0
+        if size == offset:
+            return added
+        try:
+            with (gzip.open(path, 'rb') if archive else open(path, 'rb')) as f:
+                f.seek(offset)
+                pending = b''
+                while True:
+                    data = f.read(_CHUNK)
+                    if not data:
+                        break
+                    data = pending + data
+                    last = data.rfind(b'\n')
+                    if last < 0:  # 超过一块的长行
+                        pending = data
+                        continue
+                    pending = data[last + 1:]  # 末尾未写完的行留到下一块或下次同步
+                    records = []
+                    for raw in data[:last].split(b'\n'):
+                        line_no += 1
+                        record = loads_record(raw)
+                        if record is not None:  # 结构化日志带有任务名
+                            ts, level, task = record.get('ts'), record.get('level'), record.get('task')
+                            message = '\n'.join(filter(None, (record.get('msg'), record.get('exc'))))
+                        else:
+                            ts, level, message = parse_log_line(decode_line(raw))
+                            task = None
+                        if not ts:  # 续行沿用上一条记录的时间和级别，按日期和级别过滤时不会丢失
+                            ts, level = last_ts, last_level
+                        last_ts, last_level = ts, level
+                        if message:
+                            records.append((file_id, line_no, ts, level, task, message))
+                    offset += last + 1
+                    self._commit_records(records, file_id, -1 if archive else offset, line_no, last_ts, last_level)
+                    added += len(records)
+                if archive:
+                    self._commit_records([], file_id, size, line_no, last_ts, last_level)
+        except (OSError, EOFError):
+            pass  # 文件在读取时被轮换或压缩，下次同步时处理
+        return added
+
+    def _commit_records(self, records, file_id, indexed_bytes, line_no, last_ts, last_level):
+        with self._lock, self.conn:
+            self.conn.executemany(
+                'INSERT INTO records (file_id, line, ts, level, task, message) VALUES (?, ?, ?, ?, ?, ?)',
+                records
+            )
+            self.conn.execute(
+                'UPDATE files SET indexed_bytes = ?, lines = ?, last_ts = ?, last_level = ? WHERE id = ?',
+                (indexed_bytes, line_no, last_ts, last_level, file_id)
+            )
+
+    def search(self, text='', level=None, since=None, until=None, task=None, limit=1000):
+        # text按空白分词，所有词都出现才匹配；since/until为datetime.date，包含两端的日期
+        # 返回按时间倒序的(时间, 级别, 消息, 文件路径, 行号)
+        where = []
+        params = []
+        for term in text.split():
+            if self.fts and len(term) >= _MIN_MATCH_LEN:
+                where.append('r.id IN (SELECT rowid FROM records_fts WHERE records_fts MATCH ?)')
+                params.append('"%s"' % term.replace('"', '""'))
+            else:
+                where.append('instr(r.message, ?) > 0')
+                params.append(term)
+        if level:
+            where.append('r.level = ?')
+            params.append(level)
+        if since is not None:
+            where.append('r.ts >= ?')
+            params.append(since.isoformat())
+        if until is not None:
+            where.append('r.ts < ?')
+            params.append((until + datetime.timedelta(days=1)).isoformat())
+        if task:
+            # 结构化日志按记录的任务名匹配，文本日志在消息中查找
+            where.append('(r.task = ? OR (r.task IS NULL AND instr(r.message, ?) > 0))')
+            params.extend((task, task))
+        sql = '''
+            SELECT r.ts, r.level, r.message, f.path, r.line
+            FROM records r JOIN files f ON f.id = r.file_id
+            %s
+            ORDER BY r.ts DESC, r.id DESC LIMIT ?
+        ''' % ('WHERE ' + ' AND '.join(where) if where else '')
+        params.append(limit)
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class SearchIndexHandler(logging.Handler):
+    # 挂在文件handler之后，文件写入新记录时增量更新索引，最多每interval秒读取一次文件
+    # 查询前也会同步一次，间隔内的记录不会遗漏
+
+    def __init__(self, index, current_file, interval=2.0, clock=time.monotonic):
+        super().__init__()
+        self.index = index
+        self.current_file = current_file  # 返回当前日志文件路径的函数，日志轮换后路径会改变
+        self.interval = interval
+        self.clock = clock
+        self._last_sync = None
+
+    def emit(self, record):
+        now = self.clock()
+        if self._last_sync is not None and now - self._last_sync < self.interval:
+            return
+        self._last_sync = now
+        try:
+            self.index.sync_file(self.current_file(), blocking=False)  # 不阻塞写日志的线程，下一条记录时再同步
+        except Exception:
+            self.handleError(record)
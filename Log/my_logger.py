@@ -1,29 +1,179 @@
+import os
+import queue
+import atexit
 import logging
-import datetime
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+from Log.json_log import JsonLinesFormatter
+from Log.rotating import DailyRotatingFileHandler, MAX_LOG_BYTES, MAX_TOTAL_BYTES, MAX_AGE_DAYS
+
+# 默认日志级别，生产环境为INFO，可通过环境变量TIMEARRANGER_LOG_LEVEL或set_default_level调整
+_default_level = os.environ.get('TIMEARRANGER_LOG_LEVEL', 'INFO').upper()
+DEFAULT_FORMAT = "'%(name)s:%(asctime)s  %(module)s in the %(lineno)d line : %(levelname)s  %(message)s'"
+
+_registry_lock = threading.Lock()
+_root_configured = False
+_file_handler = None  # 根日志器上的文件handler，整个进程只打开一次
+_queue_handler = None
+
+
+def set_default_level(level):
+    global _default_level
+    _default_level = level.upper() if isinstance(level, str) else logging.getLevelName(level)
+    if _root_configured:
+        logging.getLogger().setLevel(_default_level)
+
+
+def get_default_level():
+    return _default_level
+
+
+def _configure_root():
+    # 控制台handler只在根日志器上挂一次，各模块日志器向上传递记录
+    global _root_configured
+    if _root_configured:
+        return
+    root = logging.getLogger()
+    root.setLevel(_default_level)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(DEFAULT_FORMAT))
+    root.addHandler(stream_handler)
+    _root_configured = True
+
+
+def get_logger(name='root'):
+    # 日志器注册表: 同名日志器只创建一次，通过logging.getLogger共享
+    with _registry_lock:
+        _configure_root()
+        manager = logging.Logger.manager
+        logger = manager.loggerDict.get(name)
+        if isinstance(logger, LoggerHandler):
+            return logger
+        logger_class = manager.loggerClass
+        manager.setLoggerClass(LoggerHandler)
+        try:
+            return logging.getLogger(name)
+        finally:
+            manager.loggerClass = logger_class
+
+
+class BoundedQueueHandler(QueueHandler):
+    # 有界队列，队列满时按策略丢弃(drop)或阻塞(block)调用线程
+
+    def __init__(self, maxsize=10000, policy='drop'):
+        if policy not in ('drop', 'block'):
+            raise ValueError('未知的队列策略: %s' % policy)
+        super().__init__(queue.Queue(maxsize))
+        self.policy = policy
+        self.dropped = 0
+        self._lock_dropped = threading.Lock()
+
+    def enqueue(self, record):
+        if self.policy == 'block':
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock_dropped:
+                self.dropped += 1
+
+    def stats(self) -> dict:
+        return {
+            'depth': self.queue.qsize(),
+            'dropped': self.dropped,
+        }
+
+
+class _FlushingQueueListener(QueueListener):
+    # 有界队列满时put_nowait会失败，结束标记必须阻塞等待入队
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+_listeners = []
+
+
+def stop_queue_listeners():
+    # 退出前调用，等待后台线程把队列中剩余的记录写入文件
+    while _listeners:
+        _listeners.pop().stop()
+
+
+atexit.register(stop_queue_listeners)
+
+
+def current_log_file():
+    # 当前写入的日志文件路径，轮换后随之改变，未设置文件handler时为None
+    if _file_handler is None:
+        return None
+    return _file_handler.baseFilename
+
+
+def wait_log_maintenance(timeout=None):
+    # 等待文件handler在后台压缩和清理旧日志，之后扫描目录不会看到正在被压缩或删除的文件
+    if _file_handler is not None:
+        _file_handler.wait_compression(timeout)
+
+
+def add_archive_listener(listener):
+    # 日志被压缩为归档或被清理后调用listener(原路径, 归档路径)，删除时归档路径为None，在后台整理线程中执行
+    with _registry_lock:
+        if _file_handler is None:
+            raise RuntimeError('需先调用set_file_handler')
+        _file_handler.archive_listeners.append(listener)
+
+
+def add_file_companion(handler):
+    # 追加一个在文件handler写入之后处理同一记录的handler，异步模式下同样运行在后台线程
+    with _registry_lock:
+        if _file_handler is None:
+            raise RuntimeError('需先调用set_file_handler')
+        handler.setLevel(_file_handler.level)
+        if _listeners:
+            listener = _listeners[-1]
+            listener.handlers = listener.handlers + (handler,)
+        else:
+            logging.getLogger().addHandler(handler)
 
 
 class LoggerHandler(logging.Logger):
+    # 由get_logger创建，自身不挂handler，级别默认继承根日志器
 
-    # 初始化 Logger
-    def __init__(self,
-                 name='root',
-                 logger_level='DEBUG',
-                 logger_format="'%(name)s:%(asctime)s  %(module)s in the %(lineno)d line : %(levelname)s  %(message)s'"
-                 ):
-        super().__init__(name)
-
-        self.setLevel(logger_level)
-        fmt = logging.Formatter(logger_format)
-
-        stream_handler = logging.StreamHandler()
-        stream_handler.setLevel(logger_level)
-        stream_handler.setFormatter(fmt)
-        self.addHandler(stream_handler)
-
-    def set_file_handler(self, file, logger_level, fmt):
-        file_handler = logging.FileHandler(file + '//' + '%s.log' % str(datetime.date.today()))
-        file_handler.setLevel(logger_level)
-        fmt = logging.Formatter(fmt)
-        file_handler.setFormatter(fmt)
-        self.addHandler(file_handler)
+    def set_file_handler(self, file, logger_level, fmt, use_queue=False, queue_size=10000, policy='drop',
+                         structured=False, max_bytes=MAX_LOG_BYTES, max_total_bytes=MAX_TOTAL_BYTES,
+                         max_age_days=MAX_AGE_DAYS):
+        # 文件handler挂在根日志器上，重复调用不会重复打开文件
+        # structured为True时每行写一个UTF-8编码的JSON对象(见Log.json_log)，fmt不再使用
+        # 日志按日期命名，跨过午夜或超过max_bytes时轮换，旧文件压缩后按总大小和天数清理(见Log.rotating)
+        global _file_handler, _queue_handler
+        with _registry_lock:
+            if _file_handler is not None:
+                return
+            _file_handler = DailyRotatingFileHandler(
+                file, max_bytes, max_total_bytes, max_age_days, encoding='utf-8' if structured else None
+            )
+            if structured:
+                _file_handler.setFormatter(JsonLinesFormatter())
+            else:
+                _file_handler.setFormatter(logging.Formatter(fmt))
+            _file_handler.setLevel(logger_level)
+            root = logging.getLogger()
+            if not use_queue:
+                root.addHandler(_file_handler)
+                return
+            # 写文件放到后台线程，界面线程只负责入队
+            _queue_handler = BoundedQueueHandler(queue_size, policy)
+            _queue_handler.setLevel(logger_level)
+            listener = _FlushingQueueListener(_queue_handler.queue, _file_handler, respect_handler_level=True)
+            listener.start()
+            _listeners.append(listener)
+            root.addHandler(_queue_handler)
 
+    def queue_stats(self) -> dict:
+        # 异步写文件模式下的队列深度和丢弃记录数
+        if _queue_handler is None:
+            return {}
+        return _queue_handler.stats()
@@ -0,0 +1,222 @@
+import os
+import re
+import time
+import gzip
+import shutil
+import datetime
+import threading
+from logging.handlers import BaseRotatingHandler
+
+from Log.log_index import LogIndex, INDEX_SUFFIX
+
+# 日志文件命名: 当天正在写入的为 YYYY-MM-DD.log，超过大小上限后改名为 YYYY-MM-DD.N.log
+# 轮换出去的文件在后台线程中压缩为 .log.gz，压缩后仍可浏览和搜索
+MAX_LOG_BYTES = 5 * 1024 * 1024  # 单个日志文件的大小上限
+MAX_TOTAL_BYTES = 50 * 1024 * 1024  # 所有日志和归档的总大小上限
+MAX_AGE_DAYS = 30  # 超过该天数的日志和归档被删除
+
+LOG_NAME_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2})(?:\.(\d+))?\.log(\.gz)?$')
+
+
+def log_day(name):
+    # 日志文件名中的日期，不是日志文件时返回None
+    match = LOG_NAME_PATTERN.match(name)
+    if match is None:
+        return None
+    return datetime.date.fromisoformat(match.group(1))
+
+
+def compress_log(path):
+    # 压缩到临时文件后再改名，压缩中途退出不会留下不完整的归档；返回归档路径
+    archive = path + '.gz'
+    with open(path, 'rb') as src, gzip.open(archive + '.tmp', 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(archive + '.tmp', archive)
+    os.remove(path)
+    LogIndex.remove_cache(path)
+    return archive
+
+
+def apply_retention(entries, today=None, max_total_bytes=MAX_TOTAL_BYTES, max_age_days=MAX_AGE_DAYS, keep=()):
+    # entries为(路径, 文件名, 大小)列表，按时间从新到旧保留，超过天数或累计大小后的文件删除
+    # keep中的路径(正在写入的日志)不删除也计入总大小；返回被删除的路径列表
+    today = today or datetime.date.today()
+    oldest = today - datetime.timedelta(days=max_age_days)
+    keep = set(os.path.abspath(path) for path in keep)
+    logs = sorted(
+        ((log_day(name), name, path, size) for path, name, size in entries if log_day(name) is not None),
+        key=lambda entry: (entry[0], _part_order(entry[1])),
+        reverse=True
+    )
+    removed = []
+    total = 0
+    full = False  # 超过总大小后更早的文件全部删除，不留下中间缺失的日期
+    for day, name, path, size in logs:
+        if os.path.abspath(path) in keep:
+            total += size
+            continue
+        full = full or total + size > max_total_bytes
+        if day < oldest or full:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            LogIndex.remove_cache(path)
+            removed.append(path)
+            continue
+        total += size
+    return removed
+
+
+def _part_order(name):
+    # 同一天内当前文件最新，其次是序号大的分段
+    match = LOG_NAME_PATTERN.match(name)
+    if match.group(2) is None:
+        return float('inf')
+    return int(match.group(2))
+
+
+def sort_logs(paths):
+    # 按日期从新到旧排序，同一天内当前文件在前，其次是序号大的分段
+    def key(path):
+        name = os.path.basename(path)
+        return log_day(name), _part_order(name)
+    return sorted((path for path in paths if log_day(os.path.basename(path)) is not None), key=key, reverse=True)
+
+
+def archive_stale_logs(entries, keep=()):
+    # 压缩不再写入的未压缩日志(进程在压缩前退出或旧版本留下的)，返回新的归档路径列表
+    keep = set(os.path.abspath(path) for path in keep)
+    archives = []
+    for path, name, _ in entries:
+        if name.endswith('.log') and os.path.abspath(path) not in keep:
+            try:
+                archives.append(compress_log(path))
+            except OSError:
+                continue
+    return archives
+
+
+def scan_logs(folder):
+    # 返回目录中日志和归档的(路径, 文件名, 大小)列表
+    entries = []
+    with os.scandir(folder) as it:
+        for entry in it:
+            if log_day(entry.name) is not None and entry.is_file():
+                entries.append((folder + '//' + entry.name, entry.name, entry.stat().st_size))
+    return entries
+
+
+def remove_stale_indexes(folder):
+    # 删除日志已不存在的行偏移索引(旧版本删除日志时留下的)，返回被删除的索引路径列表
+    removed = []
+    with os.scandir(folder) as it:
+        for entry in it:
+            if not entry.name.endswith(INDEX_SUFFIX):
+                continue
+            log_name = entry.name[:-len(INDEX_SUFFIX)]
+            if log_day(log_name) is not None and not os.path.exists(folder + '//' + log_name):
+                LogIndex.remove_cache(folder + '//' + log_name)
+                removed.append(entry.path)
+    return removed
+
+
+class DailyRotatingFileHandler(BaseRotatingHandler):
+    # 按日期命名的日志文件，跨过午夜或超过max_bytes时换到新文件
+    # 换下的文件在后台线程中压缩，随后按总大小和天数清理目录
+
+    def __init__(self, folder, max_bytes=MAX_LOG_BYTES, max_total_bytes=MAX_TOTAL_BYTES,
+                 max_age_days=MAX_AGE_DAYS, encoding=None, clock=time.time):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.max_total_bytes = max_total_bytes
+        self.max_age_days = max_age_days
+        self.clock = clock
+        self.day = datetime.date.fromtimestamp(clock())
+        self._next_midnight = self._midnight_after(self.day)
+        self._compress_threads = []
+        self._compress_lock = threading.Lock()  # 同一时刻只有一个线程整理目录
+        # 文件被压缩或删除后在整理线程中调用listener(原路径, 归档路径)，删除时归档路径为None
+        self.archive_listeners = []
+        super().__init__(self._path_for(self.day), 'a', encoding=encoding, delay=False)
+        self._compress_in_background(None)  # 启动时整理上次运行留下的日志
+
+    def _path_for(self, day):
+        return self.folder + '//' + '%s.log' % day.isoformat()
+
+    @staticmethod
+    def _midnight_after(day):
+        return time.mktime((day + datetime.timedelta(days=1)).timetuple())
+
+    def shouldRollover(self, record):
+        if self.clock() >= self._next_midnight:
+            return True
+        if self.max_bytes > 0 and self.stream is not None:
+            # 按格式化后的长度估算，多字节字符会略微低估
+            if self.stream.tell() + len(self.format(record)) + 1 > self.max_bytes:
+                return True
+        return False
+
+    def doRollover(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        old_path = self.baseFilename
+        now_day = datetime.date.fromtimestamp(self.clock())
+        if now_day != self.day:  # 跨过午夜，昨天的文件整个归档
+            rolled = old_path
+            self.day = now_day
+            self._next_midnight = self._midnight_after(now_day)
+        else:  # 当天超过大小上限，改名为下一个分段
+            rolled = self._next_part_path(old_path)
+            os.replace(old_path, rolled)
+            LogIndex.remove_cache(old_path)
+        self.baseFilename = os.path.abspath(self._path_for(self.day))
+        self.stream = self._open()
+        self._compress_in_background(rolled, old_path)
+
+    def _next_part_path(self, path):
+        stem = path[:-len('.log')]
+        part = 1
+        while os.path.exists('%s.%d.log' % (stem, part)) or os.path.exists('%s.%d.log.gz' % (stem, part)):
+            part += 1
+        return '%s.%d.log' % (stem, part)
+
+    def _compress_in_background(self, path, source=None):
+        # source为轮换前写入时的路径，大小轮换时与改名后的path不同
+        thread = threading.Thread(target=self._compress, args=(path, source or path), name='LogCompress', daemon=True)
+        self._compress_threads = [t for t in self._compress_threads if t.is_alive()] + [thread]
+        thread.start()
+
+    def _compress(self, path, source):
+        with self._compress_lock:
+            try:
+                if path is not None:
+                    self._notify(source, compress_log(path))
+                for archive in archive_stale_logs(scan_logs(self.folder), keep=(self.baseFilename,)):
+                    self._notify(archive[:-len('.gz')], archive)
+                for removed in apply_retention(
+                    scan_logs(self.folder),
+                    max_total_bytes=self.max_total_bytes,
+                    max_age_days=self.max_age_days,
+                    keep=(self.baseFilename,)
+                ):
+                    self._notify(removed, None)
+                remove_stale_indexes(self.folder)
+            except OSError:
+                pass  # 文件被占用时保留未压缩的日志，下次启动时再处理
+
+    def _notify(self, source, archive):
+        for listener in list(self.archive_listeners):
+            try:
+                listener(source, archive)
+            except Exception:
+                pass  # 监听者出错不影响日志整理
+
+    def wait_compression(self, timeout=None):
+        for thread in self._compress_threads:
+            thread.join(timeout)
+
+    def close(self):
+        self.wait_compression(5)
+        super().close()
@@ -0,0 +1,45 @@
+import time
+import logging
+
+
+class TickTelemetry:
+    # 计时tick的采样统计通道，代替每秒一条的调试日志，每个统计窗口只输出一条汇总记录
+
+    def __init__(self, logger, interval=60, level=logging.DEBUG, clock=time.monotonic):
+        self.logger = logger
+        self.interval = interval
+        self.level = level
+        self.clock = clock
+        self._reset(self.clock())
+
+    def _reset(self, now):
+        self.window_start = now
+        self.count = 0
+        self.min_ms = None
+        self.max_ms = 0.0
+        self.sum_ms = 0.0
+
+    def add(self, latency_ms):
+        # 日志级别未开启时不做任何统计
+        if not self.logger.isEnabledFor(self.level):
+            return
+        self.count += 1
+        self.sum_ms += latency_ms
+        if self.min_ms is None or latency_ms < self.min_ms:
+            self.min_ms = latency_ms
+        if latency_ms > self.max_ms:
+            self.max_ms = latency_ms
+        now = self.clock()
+        if now - self.window_start >= self.interval:
+            self.flush(now)
+
+    def flush(self, now=None):
+        if now is None:
+            now = self.clock()
+        if self.count:
+            self.logger.log(
+                self.level,
+                'tick统计: %d次, 延迟min=%.1fms max=%.1fms mean=%.1fms',
+                self.count, self.min_ms, self.max_ms, self.sum_ms / self.count
+            )
+        self._reset(now)
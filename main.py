@@ -1,10 +1,42 @@
 import sys
+import time
+_start = time.perf_counter()  # 启动分析的起点，必须在导入Qt之前记录
+
+import argparse
 
 from PyQt5.QtWidgets import QApplication
+_qt_imported = time.perf_counter()
 from FrontEnd.InitTAWidget import InitTAWidget
+from FrontEnd.StartupProfiler import StartupProfiler
+from Log.my_logger import set_default_level
+_app_imported = time.perf_counter()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='TimeArranger')
+    parser.add_argument('--log-level', default=None, help='日志级别, 如DEBUG/INFO/WARNING, 默认INFO')
+    parser.add_argument('--profile-startup', metavar='REPORT', default=None,
+                        help='记录启动各阶段耗时直到主界面第一次绘制, 写入JSON报告')
+    parser.add_argument('--exit-after-first-paint', action='store_true',
+                        help='与--profile-startup一起使用, 主界面第一次绘制后退出')
+    # 其余参数交给Qt处理
+    return parser.parse_known_args(argv[1:])
 
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
+    args, qt_args = parse_args(sys.argv)
+    if args.log_level is not None:
+        set_default_level(args.log_level)
+    profiler = None
+    if args.profile_startup is not None:
+        profiler = StartupProfiler(_start, args.profile_startup, args.exit_after_first_paint)
+        profiler.mark('import_qt', _qt_imported)
+        profiler.mark('import_app', _app_imported)
+    app = QApplication(sys.argv[:1] + qt_args)
+    if profiler is not None:
+        profiler.mark('qapplication')
     win = InitTAWidget()
-    sys.exit(app.exec())
\ No newline at end of file
+    if profiler is not None:
+        profiler.mark('main_window_constructed')
+        profiler.watch(win)
+    sys.exit(app.exec())